@@ -0,0 +1,280 @@
+"""
+Offline doubles of the services used by the music pipeline: yt-dlp, the audio CDN, the voice gateway
+and the command contexts.
+"""
+
+import io
+import json
+import math
+import threading
+import time
+import wave
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from aiohttp import web
+from discord import AudioSource
+from yt_dlp import utils
+
+PLAYLIST_PAGE_SIZE: int = 100
+
+
+class FakeYoutubeDL:
+    """
+    Stand-in for `YoutubeDL` replaying `extract_info` results with a configurable latency.
+
+    Results are taken from recorded fixtures when the query is known, and are otherwise generated:
+    `ytsearch<N>:` queries return N flat entries, playlist URLs return `playlist_size` flat entries
+    fetched by pages, and video URLs return a stream served by the local audio server.
+    """
+
+    fixtures: Dict[str, Any] = {}
+    latency: float = 0.2
+    page_latency: float = 0.1
+    playlist_size: int = 500
+    audio_url: str = "http://127.0.0.1:8080/audio.wav"
+    calls: int = 0
+
+    params: Dict
+
+    def __init__(self, params: Optional[Dict] = None):
+        self.params = dict(params or {})
+
+        if isinstance(self.params.get("match_filter"), str):
+            self.params["match_filter"] = utils.match_filter_func(self.params["match_filter"])
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load recorded `extract_info` results.
+
+        Args:
+            path (str): JSON file mapping queries to their result.
+        """
+        with open(path) as file:
+            cls.fixtures = json.load(file)
+
+    @staticmethod
+    def get_entry(id: str) -> Dict:
+        return {
+            "_type": "url",
+            "ie_key": "Youtube",
+            "id": id,
+            "url": f"https://www.youtube.com/watch?v={id}",
+            "title": f"Benchmark track {id}",
+            "duration": 2,
+            "thumbnails": [{"url": f"https://i.ytimg.com/vi/{id}/hqdefault.jpg"}],
+        }
+
+    def get_entries(self, prefix: str, count: int, paged: bool) -> Iterator[Dict]:
+        for index in range(count):
+            if paged and index % PLAYLIST_PAGE_SIZE == 0:
+                time.sleep(self.page_latency)
+            yield self.get_entry(f"{prefix}{index:06d}")
+
+    def extract_info(self, query: str, download: bool = False, process: bool = True) -> Any:
+        type(self).calls += 1
+        time.sleep(self.latency)
+
+        if query in self.fixtures:
+            return self.fixtures[query]
+
+        if query.startswith("ytsearch"):
+            count_text, _, text = query.removeprefix("ytsearch").partition(":")
+            entries: Any = self.get_entries(str(abs(hash(text)) % 10**5), int(count_text or 1), False)
+            return {"_type": "playlist", "entries": entries if not process else list(entries)}
+
+        if "list=" in query:
+            entries = self.get_entries("pl", self.playlist_size, True)
+            return {"_type": "playlist", "entries": entries if not process else list(entries)}
+
+        id: str = query.rpartition("v=")[2]
+        return {**self.get_entry(id), "url": self.audio_url, "acodec": "pcm_s16le", "webpage_url": query}
+
+    def sanitize_info(self, data: Any) -> Any:
+        return data
+
+
+class AudioServer:
+    """
+    Local HTTP server serving a generated WAV file to FFmpeg.
+    """
+
+    duration: float
+    port: int
+    data: bytes
+    runner: Optional[web.AppRunner]
+
+    def __init__(self, duration: float = 2, port: int = 8080):
+        self.duration = duration
+        self.port = port
+        self.data = self.get_wav(duration)
+        self.runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/audio.wav"
+
+    @staticmethod
+    def get_wav(duration: float) -> bytes:
+        """
+        Generate a stereo 48 kHz 440 Hz sine.
+
+        Args:
+            duration (float): Duration in seconds.
+
+        Returns:
+            bytes: The WAV file.
+        """
+        samples: bytearray = bytearray()
+
+        for index in range(int(48000 * duration)):
+            samples += int(8000 * math.sin(2 * math.pi * 440 * index / 48000)).to_bytes(2, "little", signed=True) * 2
+
+        buffer: io.BytesIO = io.BytesIO()
+
+        with wave.open(buffer, "wb") as file:
+            file.setnchannels(2)
+            file.setsampwidth(2)
+            file.setframerate(48000)
+            file.writeframes(bytes(samples))
+
+        return buffer.getvalue()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.data, content_type="audio/wav")
+
+    async def start(self):
+        app: web.Application = web.Application()
+        app.router.add_get("/audio.wav", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+class FakeVoiceClient:
+    """
+    Stand-in for `VoiceClient` consuming the frames of the played source at the 20 ms pace of the voice gateway.
+    """
+
+    channel: Any
+    source: Optional[AudioSource]
+    speed: float
+    frames: int
+    late_frames: int
+    starts: List[float]
+    ends: List[float]
+    _connected: bool
+    _paused: threading.Event
+    _thread: Optional[threading.Thread]
+    _stop: threading.Event
+
+    def __init__(self, channel: Any, speed: float = 1):
+        self.channel = channel
+        self.source = None
+        self.speed = speed
+        self.frames = 0
+        self.late_frames = 0
+        self.starts = []
+        self.ends = []
+        self._connected = True
+        self._paused = threading.Event()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def is_playing(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._paused.is_set()
+
+    def is_paused(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self._paused.is_set()
+
+    def play(self, source: AudioSource, *, after: Optional[Callable[[Optional[Exception]], Any]] = None):
+        self.source = source
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, args=(source, after, self._stop), daemon=True)
+        self._thread.start()
+
+    def run(self, source: AudioSource, after: Optional[Callable], stop: threading.Event):
+        delay: float = 0.02 / self.speed
+        deadline: float = time.perf_counter()
+        first: bool = True
+
+        while not stop.is_set():
+            if self._paused.is_set():
+                time.sleep(delay)
+                deadline = time.perf_counter()
+                continue
+
+            frame: bytes = source.read()
+            now: float = time.perf_counter()
+
+            if not frame:
+                break
+            if first:
+                self.starts.append(now)
+                first = False
+            elif now > deadline + delay:
+                self.late_frames += 1
+
+            self.frames += 1
+            deadline += delay
+            time.sleep(max(0, deadline - time.perf_counter()))
+
+        self.ends.append(time.perf_counter())
+        source.cleanup()
+
+        if after is not None:
+            after(None)
+
+    def pause(self):
+        self._paused.set()
+
+    def resume(self):
+        self._paused.clear()
+
+    def stop(self):
+        self._stop.set()
+
+    async def move_to(self, channel: Any):
+        self.channel = channel
+
+    async def disconnect(self, force: bool = False):
+        self._stop.set()
+        self._connected = False
+
+
+class FakeMessage:
+    async def edit(self, **kwargs) -> "FakeMessage":
+        return self
+
+
+def get_context(guild_id: int, speed: float = 1) -> Any:
+    """
+    Build a command context of a member connected to a voice channel of a guild.
+
+    Args:
+        guild_id (int): Id of the guild.
+        speed (float): Speed at which the voice clients consume frames.
+
+    Returns:
+        Any: The context.
+    """
+
+    async def send(*args, **kwargs) -> FakeMessage:
+        return FakeMessage()
+
+    async def connect() -> FakeVoiceClient:
+        return FakeVoiceClient(channel, speed)
+
+    channel: Any = SimpleNamespace(id=guild_id, name=f"voice-{guild_id}", connect=connect)
+    author: Any = SimpleNamespace(id=guild_id, mention=f"<@{guild_id}>", send=send)
+    member: Any = SimpleNamespace(id=guild_id, voice=SimpleNamespace(channel=channel))
+    guild: Any = SimpleNamespace(id=guild_id, get_member=lambda id: member)
+    return SimpleNamespace(guild=guild, author=author, interaction=None, send=send, channel=SimpleNamespace(send=send))
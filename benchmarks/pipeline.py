@@ -0,0 +1,229 @@
+"""
+Benchmark the music pipeline offline, against a fake YouTube, a local audio server and fake voice clients.
+
+Reports the latency of the `add` command, the queue rendering time, the playlist ingestion time,
+the gap between two tracks, the memory per queued track and the throughput of simulated guilds.
+The track gap is only measured when `ffmpeg` is available.
+
+Usage:
+    python -m benchmarks.pipeline [--commands 200] [--latency 0.2] [--guilds 50] [--fixtures fixtures.json]
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import click
+import yt_dlp
+
+os.environ.setdefault("METADATA_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "metadata.sqlite3"))
+os.environ.setdefault("QUEUE_JOURNAL_PATH", "")
+os.environ.setdefault("SEARCH_INDEX_PATH", "")
+
+from benchmarks import fakes, track_memory  # noqa: E402
+from discord_bot.extensions.music import Music  # noqa: E402
+from discord_bot.main import client  # noqa: E402
+from discord_bot.utils.extractor import extractor  # noqa: E402
+from discord_bot.utils.panel import panel_updates  # noqa: E402
+from discord_bot.utils.player import Player  # noqa: E402
+from discord_bot.utils.queue import MusicQueue  # noqa: E402
+from discord_bot.utils.youtube import YoutubeSourceInfo  # noqa: E402
+
+
+def report(name: str, text: str):
+    print(f"{name + ':':<26}{text}")
+
+
+def get_percentile(values: List[float], percentile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+async def time_calls(call: Callable[[int], Awaitable[Any]], count: int) -> List[float]:
+    """
+    Time sequential calls of a coroutine function.
+
+    Args:
+        call (Callable[[int], Awaitable[Any]]): The function, given the index of the call.
+        count (int): Number of calls.
+
+    Returns:
+        List[float]: Duration of each call in seconds.
+    """
+    durations: List[float] = []
+
+    for index in range(count):
+        start: float = time.perf_counter()
+        await call(index)
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+async def benchmark_add(music: Music, commands: int):
+    context: Any = fakes.get_context(1)
+
+    def add(index: int) -> Awaitable[Any]:
+        return music.add.callback(music, context, query=f"benchmark add {index}")
+
+    # The second run hits the metadata cache filled by the first one.
+    cold: List[float] = await time_calls(add, commands)
+    warm: List[float] = await time_calls(add, commands)
+
+    for name, durations in (("cold", cold), ("cached", warm)):
+        p50, p99 = get_percentile(durations, 50) * 1e3, get_percentile(durations, 99) * 1e3
+        report(f"add latency ({name})", f"p50 {p50:>8.2f} ms   p99 {p99:>8.2f} ms")
+
+    music.players.remove(1)
+
+
+async def benchmark_batch(music: Music, queries: int):
+    context: Any = fakes.get_context(5)
+
+    start: float = time.perf_counter()
+    await music.add.callback(music, context, query="\n".join(f"benchmark batch {index}" for index in range(queries)))
+    total: float = time.perf_counter() - start
+
+    report("batch add", f"all {total * 1e3:>8.1f} ms ({queries} queries, {len(music.players.get(5).queue)} tracks)")
+    music.players.remove(5)
+
+
+async def benchmark_queue(music: Music, tracks: int, repeat: int):
+    context: Any = fakes.get_context(2)
+    player: Player = music.players.get(2)
+    player.queue.extend((YoutubeSourceInfo(track_memory.get_entry(index)) for index in range(tracks)), context)
+    pages: int = music.get_queue_pages(player)
+
+    for name, cached in (("uncached", False), ("cached", True)):
+        durations: List[float] = []
+
+        for index in range(repeat):
+            if not cached:
+                player.pages_version = -1
+            start: float = time.perf_counter()
+            music.get_queue_embed(context, player, index % pages)
+            durations.append(time.perf_counter() - start)
+
+        report(f"queue page ({name})", f"p50 {get_percentile(durations, 50) * 1e6:>8.1f} us ({tracks} tracks)")
+
+    music.players.remove(2)
+
+
+async def benchmark_playlist(music: Music):
+    context: Any = fakes.get_context(3)
+    player: Player = music.players.get(3)
+
+    start: float = time.perf_counter()
+    task: asyncio.Task = asyncio.create_task(music.enqueue(context, "https://www.youtube.com/playlist?list=benchmark"))
+
+    while not player.queue and not task.done():
+        await asyncio.sleep(0.001)
+
+    first: float = time.perf_counter() - start
+    await task
+    total: float = time.perf_counter() - start
+
+    report(
+        "playlist ingestion", f"first {first * 1e3:>7.1f} ms   all {total * 1e3:>8.1f} ms ({len(player.queue)} tracks)"
+    )
+    music.players.remove(3)
+
+
+async def benchmark_gap(music: Music, tracks: int, speed: float):
+    if shutil.which("ffmpeg") is None:
+        report("track gap", "skipped, ffmpeg is not available")
+        return
+
+    context: Any = fakes.get_context(4, speed)
+    player: Player = music.players.get(4)
+    player.voice_client = await context.guild.get_member(4).voice.channel.connect()
+    player.queue.extend([YoutubeSourceInfo(fakes.FakeYoutubeDL.get_entry(f"gap{i}")) for i in range(tracks)], context)
+
+    await music.play_music(player)
+
+    while player.current is not None or player.queue:
+        await asyncio.sleep(0.05)
+
+    voice_client: fakes.FakeVoiceClient = player.voice_client  # type: ignore
+    gaps: List[float] = [start - end for start, end in zip(voice_client.starts[1:], voice_client.ends)]
+    report(
+        "track gap",
+        f"p50 {get_percentile(gaps, 50) * 1e3:>8.1f} ms   max {max(gaps) * 1e3:>8.1f} ms "
+        f"({voice_client.late_frames} late frames / {voice_client.frames})",
+    )
+    report(
+        "panel updates",
+        f"{panel_updates.get('sent'):>8.0f} sent   {panel_updates.get('coalesced'):>5.0f} coalesced ({tracks} tracks)",
+    )
+    music.players.remove(4)
+
+
+async def benchmark_guilds(music: Music, guilds: int, commands: int):
+    async def run(guild_id: int):
+        context: Any = fakes.get_context(guild_id)
+        for index in range(commands):
+            await music.add.callback(music, context, query=f"benchmark guild {guild_id} {index}")
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(run(1000 + guild_id) for guild_id in range(guilds)))
+    duration: float = time.perf_counter() - start
+
+    report("throughput", f"{guilds * commands / duration:.1f} commands/s ({guilds} guilds)")
+
+    for guild_id in range(guilds):
+        music.players.remove(1000 + guild_id)
+
+
+def build_queue(entries: List[Dict]) -> MusicQueue:
+    queue: MusicQueue = MusicQueue()
+    queue.extend((YoutubeSourceInfo(entry) for entry in entries), SimpleNamespace(author=SimpleNamespace(id=0)))
+    return queue
+
+
+async def run(commands: int, guilds: int, tracks: int, speed: float):
+    client.loop = asyncio.get_running_loop()
+    server: fakes.AudioServer = fakes.AudioServer()
+    await server.start()
+    fakes.FakeYoutubeDL.audio_url = server.url
+
+    music: Music = Music()
+
+    try:
+        await benchmark_add(music, commands)
+        await benchmark_batch(music, 10)
+        await benchmark_queue(music, 10000, commands)
+        await benchmark_playlist(music)
+        await benchmark_gap(music, tracks, speed)
+        await benchmark_guilds(music, guilds, 5)
+    finally:
+        extractor.shutdown()
+        await server.stop()
+
+
+@click.command()
+@click.option("--commands", type=click.INT, default=200, help="Number of timed commands.")
+@click.option("--latency", type=click.FLOAT, default=0.2, help="Latency of a fake extraction, in seconds.")
+@click.option("--guilds", type=click.INT, default=50, help="Number of simulated guilds.")
+@click.option("--tracks", type=click.INT, default=5, help="Number of tracks played to measure the gap.")
+@click.option("--speed", type=click.FLOAT, default=4, help="Speed at which the fake voice clients read frames.")
+@click.option("--fixtures", type=click.Path(exists=True), help="JSON file of recorded extract_info results.")
+def main(commands: int, latency: float, guilds: int, tracks: int, speed: float, fixtures: Optional[str]):
+    yt_dlp.YoutubeDL = fakes.FakeYoutubeDL  # type: ignore
+    fakes.FakeYoutubeDL.latency = latency
+
+    if fixtures:
+        fakes.FakeYoutubeDL.load(fixtures)
+
+    asyncio.run(run(commands, guilds, tracks, speed))
+
+    compact: int = track_memory.measure(build_queue, 10000)
+    report("memory per queued track", f"{compact / 10000:>8.0f} B")
+    report("extractions", f"{fakes.FakeYoutubeDL.calls:>8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare the memory retained per queued track before and after the compact track records.
+
+Usage:
+    python -m benchmarks.track_memory [--tracks 10000]
+"""
+
+import gc
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple
+
+import click
+
+from discord_bot.utils.queue import MusicQueue
+from discord_bot.utils.youtube import YoutubeSourceInfo
+
+
+class LegacyYoutubeSourceInfo:
+    """
+    Track record as it was before, retaining the whole yt-dlp data.
+    """
+
+    def __init__(self, data: Dict):
+        self.data = data
+        self.title = data["title"]
+        self.url = data["url"]
+        self.duration = data["duration"]
+        self.thumbnail = data["thumbnails"][-1]["url"]
+
+
+def get_entry(index: int) -> Dict:
+    """
+    Build a synthetic yt-dlp flat playlist entry.
+
+    Args:
+        index (int): Index of the track, used to make every entry unique.
+
+    Returns:
+        Dict: The entry.
+    """
+    id: str = f"{index:011d}"
+    return {
+        "_type": "url",
+        "ie_key": "Youtube",
+        "id": id,
+        "url": f"https://www.youtube.com/watch?v={id}",
+        "title": f"Synthetic track number {index} (Official Music Video)",
+        "description": f"Description of the synthetic track number {index}. " * 5,
+        "duration": 180 + index % 120,
+        "channel": "Synthetic Channel",
+        "channel_id": "UC0123456789abcdefghijkl",
+        "channel_url": "https://www.youtube.com/channel/UC0123456789abcdefghijkl",
+        "view_count": index * 1000,
+        "live_status": None,
+        "thumbnails": [
+            {
+                "url": f"https://i.ytimg.com/vi/{id}/hq{size}.jpg?sqp=-oaymwE{size}",
+                "height": size,
+                "width": size * 16 // 9,
+            }
+            for size in range(90, 1090, 50)
+        ],
+    }
+
+
+def measure(build: Callable[[List[Dict]], Any], tracks: int) -> int:
+    """
+    Measure the memory retained by a queue built from synthetic entries.
+
+    Args:
+        build (Callable[[List[Dict]], Any]): Build the queue from the entries.
+        tracks (int): Number of tracks in the queue.
+
+    Returns:
+        int: Retained bytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+
+    queue: Any = build([get_entry(index) for index in range(tracks)])
+
+    gc.collect()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del queue
+    return size
+
+
+@click.command()
+@click.option("--tracks", type=click.INT, default=10000, help="Number of queued tracks.")
+def main(tracks: int):
+    context: Any = SimpleNamespace(author=SimpleNamespace(id=378640664734466058))
+
+    def build_legacy(entries: List[Dict]) -> List[Tuple[LegacyYoutubeSourceInfo, Any]]:
+        return [(LegacyYoutubeSourceInfo(entry), context) for entry in entries]
+
+    def build_compact(entries: List[Dict]) -> MusicQueue:
+        queue: MusicQueue = MusicQueue()
+        queue.extend((YoutubeSourceInfo(entry) for entry in entries), context)
+        return queue
+
+    legacy: int = measure(build_legacy, tracks)
+    compact: int = measure(build_compact, tracks)
+
+    print(f"Tracks: {tracks}")
+    print(f"Legacy:  {legacy / tracks:>8.0f} B/track ({legacy / 2**20:.1f} MiB)")
+    print(f"Compact: {compact / tracks:>8.0f} B/track ({compact / 2**20:.1f} MiB)")
+    print(f"Ratio:   {legacy / compact:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Compare the per frame overhead of the batched volume / normalization engine with the audioop path
+of `PCMVolumeTransformer` it replaces.
+
+Usage:
+    python -m benchmarks.volume [--frames 3000] [--repeat 5]
+"""
+
+import math
+import time
+import warnings
+from typing import Callable, List
+
+import click
+from discord import AudioSource, PCMVolumeTransformer
+from discord.opus import Encoder
+
+from discord_bot.utils.audio import NUMPY, scale
+from discord_bot.utils.youtube import YoutubeSource
+
+
+class MemorySource(AudioSource):
+    """
+    PCM source replaying frames held in memory.
+    """
+
+    def __init__(self, frames: List[bytes]):
+        self.frames = iter(frames)
+
+    def read(self) -> bytes:
+        return next(self.frames, b"")
+
+
+def get_frames(count: int) -> List[bytes]:
+    """
+    Build 20 ms frames of a stereo 440 Hz sine.
+
+    Args:
+        count (int): Number of frames.
+
+    Returns:
+        List[bytes]: The frames.
+    """
+    samples: int = Encoder.SAMPLES_PER_FRAME
+    frames: List[bytes] = []
+
+    for index in range(count):
+        values = [int(8000 * math.sin(2 * math.pi * 440 * (index * samples + i) / 48000)) for i in range(samples)]
+        frame: bytearray = bytearray()
+        for value in values:
+            frame += value.to_bytes(2, "little", signed=True) * 2
+        frames.append(bytes(frame))
+
+    return frames
+
+
+def measure(create: Callable[[List[bytes]], AudioSource], frames: List[bytes], repeat: int) -> float:
+    """
+    Measure the time needed to read every frame of a source.
+
+    Args:
+        create (Callable[[List[bytes]], AudioSource]): Create the source reading the frames.
+        frames (List[bytes]): The frames.
+        repeat (int): Number of runs, the best one is kept.
+
+    Returns:
+        float: Microseconds per frame.
+    """
+    best: float = math.inf
+
+    for _ in range(repeat):
+        source: AudioSource = create(frames)
+        start: float = time.perf_counter()
+        while source.read():
+            pass
+        best = min(best, time.perf_counter() - start)
+
+    return best / len(frames) * 1e6
+
+
+@click.command()
+@click.option("--frames", type=click.INT, default=3000, help="Number of 20 ms frames read per run.")
+@click.option("--repeat", type=click.INT, default=5, help="Number of runs.")
+def main(frames: int, repeat: int):
+    warnings.simplefilter("ignore", DeprecationWarning)
+    data: List[bytes] = get_frames(frames)
+
+    # numpy is imported by the first scaled batch, keep its import out of the measures.
+    scale(data[0], 0.5)
+
+    audioop: float = measure(lambda frames: PCMVolumeTransformer(MemorySource(frames), 0.5), data, repeat)
+    batched: float = measure(lambda frames: YoutubeSource(MemorySource(frames), 0.5, normalize=False), data, repeat)
+    normalized: float = measure(lambda frames: YoutubeSource(MemorySource(frames), 0.5, normalize=True), data, repeat)
+
+    print(f"Frames: {frames} (numpy: {'yes' if NUMPY else 'no'})")
+    print(f"audioop PCMVolumeTransformer: {audioop:>6.2f} us/frame")
+    print(f"Batched volume:               {batched:>6.2f} us/frame")
+    print(f"Batched volume + loudness:    {normalized:>6.2f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import sys
+from typing import List
+
+from discord_bot.utils.startup import startup
+
+if "--startup-report" in sys.argv[1:]:
+    startup.enable()
+
+
+def main():
+    """
+    Entry point of the bot. The startup report is enabled before the bot modules are imported,
+    so that the import timer also sees discord.py, aiohttp and the other dependencies of the bot.
+    """
+    from discord_bot.main import main
+
+    main()
+
+
+def run(token: str, shard_count: int, shard_ids: List[int], index: int):
+    """
+    Entry point of the processes started by the shard supervisor, importing the bot modules
+    once the import timer runs, as the startup report is enabled by the inherited `STARTUP_REPORT`.
+
+    Args:
+        token (str): Token of the bot.
+        shard_count (int): Total number of shards.
+        shard_ids (List[int]): Shards run by the process.
+        index (int): Index of the process.
+    """
+    from discord_bot.main import run
+
+    run(token, shard_count, shard_ids, index)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,84 @@ import asyncio
 import ctypes
 import ctypes.util
 import os
+import re
+import time
 from datetime import timedelta
-from typing import List, Optional, Tuple
-
-from discord import Color, Embed, Member, VoiceClient, VoiceState, opus
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from discord import (
+    Attachment,
+    AudioSource,
+    ClientException,
+    Color,
+    Embed,
+    Guild,
+    Interaction,
+    Member,
+    Message,
+    PCMVolumeTransformer,
+    VoiceChannel,
+    VoiceClient,
+    VoiceState,
+    opus,
+)
+from discord.app_commands import Choice
 from discord.ext.commands import Cog, Context, hybrid_command
+from discord.opus import Encoder
 
 from discord_bot.main import MODULE_EMOJIS, Client, client
+from discord_bot.utils.audio import load_numpy
+from discord_bot.utils.audio_cache import audio_cache
+from discord_bot.utils.audio_worker import WorkerSource
+from discord_bot.utils.autocomplete import autocomplete
 from discord_bot.utils.communication import send
-from discord_bot.utils.youtube import YoutubeSource, YoutubeSourceInfo
+from discord_bot.utils.diagnostics import FrameStats, MonitoredSource
+from discord_bot.utils.extractor import extractor
+from discord_bot.utils.idle import IdleScheduler
+from discord_bot.utils.journal import QUEUE_RESUME, GuildState, Record, RestoredContext, queue_journal
+from discord_bot.utils.metrics import Gauge, Labels, metrics, playback_errors
+from discord_bot.utils.panel import Panel
+from discord_bot.utils.player import Player, PlayerRegistry
+from discord_bot.utils.queue import QueueEntry
+from discord_bot.utils.search_index import search_index
+from discord_bot.utils.youtube import SHORT_TITLE_LENGTH, YoutubeSource, YoutubeSourceInfo
 from discord_bot.views.music import PlayView, QueueView, SearchView
 
-OPUS_LIBRARY_PATH: Optional[str] = os.environ.get("OPUS_LIBRARY_PATH", ctypes.util.find_library("opus"))
+OPUS_LIBRARY_PATH: Optional[str] = os.environ.get("OPUS_LIBRARY_PATH")
 INACTIVITY_TIMEOUT: int = 600
-INACTIVITY_WAIT_INTERVAL: int = 30
+ADD_RESPONSE_UPDATE_INTERVAL: float = 2
+QUEUE_PAGE_SIZE: int = 20
+ADD_BATCH_CONCURRENCY: int = int(os.environ.get("ADD_BATCH_CONCURRENCY", 4))
+ADD_BATCH_LIMIT: int = 50
+ADD_BATCH_FILE_SIZE: int = 64 * 2**10
+ADD_FAILED_FIELD_SIZE: int = 1024
+SEARCH_RESULTS: int = 10
+
+
+def load_opus():
+    """
+    Load the Opus library used to encode the decoded songs, if it is not already loaded.
+    The library is searched for when `OPUS_LIBRARY_PATH` is not defined.
+    """
+    if opus.is_loaded():
+        return
+
+    path: Optional[str] = OPUS_LIBRARY_PATH or ctypes.util.find_library("opus")
+    if path:
+        opus.load_opus(path)
+
+
+def split_queries(text: str) -> List[str]:
+    """
+    Split a list of queries separated by new lines or semicolons.
+
+    Args:
+        text (str): The list of queries.
+
+    Returns:
+        List[str]: The non empty queries, in order.
+    """
+    return [query.strip() for query in re.split(r"[\n;]", text) if query.strip()]
 
 
 class Music(Cog):
@@ -23,13 +87,106 @@ class Music(Cog):
     Control the musics played by the bot.
     """
 
-    music_queue: List[Tuple[YoutubeSourceInfo, Context]] = []
-    voice_channel: Optional[VoiceClient] = None
+    players: PlayerRegistry
+    idle: IdleScheduler[int]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        if OPUS_LIBRARY_PATH:
-            opus.load_opus(OPUS_LIBRARY_PATH)
+        self.players = PlayerRegistry()
+        self.idle = IdleScheduler(INACTIVITY_TIMEOUT, self.on_idle)
+
+        metrics.register(Gauge("voice_clients", "Connected voice clients.", function=self.get_voice_clients))
+        metrics.register(Gauge("queue_size", "Tracks waiting in the queues.", ["aggregate"], self.get_queue_sizes))
+
+    async def warm_up(self):
+        """
+        Restore the queues saved before the restart, load the Opus library, numpy, the search index and create the
+        yt-dlp instances of the extractor workers, so the first song played does not wait for them. (asynchronous)
+        """
+        await asyncio.get_running_loop().run_in_executor(None, load_opus)
+        await asyncio.get_running_loop().run_in_executor(None, load_numpy)
+        await search_index.load()
+        await self.restore()
+        await extractor.warm_up({"info": YoutubeSourceInfo.youtube_options, "source": YoutubeSource.youtube_options})
+
+    async def cog_unload(self):
+        self.idle.stop()
+
+    async def restore(self):
+        """
+        Restore the queues of the guilds handled by this process, as they were before the restart. (asynchronous)
+        """
+        states: Dict[int, GuildState] = await queue_journal.load()
+        await asyncio.gather(
+            *(self.restore_guild(guild_id, state) for guild_id, state in states.items() if client.owns(guild_id))
+        )
+
+    async def restore_guild(self, guild_id: int, state: GuildState):
+        """
+        Restore the queue of a guild. With `QUEUE_RESUME`, the bot also joins its voice channel again
+        and resumes the song that was playing near its last position. (asynchronous)
+
+        Args:
+            guild_id (int): Id of the guild.
+            state (GuildState): Saved queue and voice session of the guild.
+        """
+        guild: Optional[Guild] = client.get_guild(guild_id)
+
+        if guild is None:
+            queue_journal.untrack(guild_id)
+            queue_journal.compact(guild_id)
+            return
+
+        player: Player = self.players.get(guild_id)
+        session: Optional[Dict] = state.session
+        records: List[Record] = state.entries
+
+        if session is not None and session["current"] is not None:
+            records = [session["current"], *records]
+
+        listener, player.queue.listener = player.queue.listener, None
+        for record in records:
+            player.queue.append(YoutubeSourceInfo(record["song"]), RestoredContext.create(guild, record))
+        player.queue.listener = listener
+        queue_journal.compact(guild_id)
+
+        channel: Any = guild.get_channel(session["channel"]) if session is not None else None
+
+        if not QUEUE_RESUME or not player.queue or not isinstance(channel, VoiceChannel):
+            return
+
+        assert session is not None
+        player.volume = session["volume"]
+        player.seek = session["position"] if session["current"] is not None else 0
+        load_opus()
+
+        try:
+            player.voice_client = await channel.connect()
+        except (asyncio.TimeoutError, ClientException) as e:
+            print(f"Error: failed to join the channel {channel.id} again: {e}")
+            return
+
+        await self.play_music(player)
+
+    def get_voice_clients(self) -> Dict[Labels, float]:
+        return {(): sum(player.is_connected() for player in self.players.players.values())}
+
+    def get_queue_sizes(self) -> Dict[Labels, float]:
+        sizes: List[int] = [len(player.queue) for player in self.players.players.values()]
+        return {("total",): sum(sizes), ("max",): max(sizes, default=0)}
+
+    def get_player(self, context: Context) -> Player:
+        """
+        Get the player of the guild where the command was invoked.
+
+        Args:
+            context (Context): Context of the command.
+
+        Returns:
+            Player: The guild player.
+        """
+        assert context.guild is not None
+        return self.players.get(context.guild.id)
 
     ### EMBEDS ###
 
@@ -52,8 +209,42 @@ class Music(Cog):
         description: str = f"{context.author.mention} {content}" if prefix else content
         return Embed(title=title, color=color, description=description)
 
+    def get_songs_fields(self, songs: List[YoutubeSourceInfo], offset: int = 0) -> Tuple[str, str]:
+        """
+        Get the content of the track and duration fields describing songs.
+
+        Args:
+            songs (List[YoutubeSource]): List of songs.
+            offset (int): Position of the first song.
+
+        Returns:
+            Tuple[str, str]: The track names and track durations.
+        """
+        track_names: str = "".join(
+            f"`#{index}` - `{song.short_title}`\n" for index, song in enumerate(songs, offset + 1)
+        )
+        track_durations: str = "".join(f"`{song.duration_text}`\n" for song in songs)
+        return track_names, track_durations
+
+    def add_songs_fields(self, embed: Embed, fields: Tuple[str, str], count: int) -> Embed:
+        """
+        Add the track and duration fields to an embed.
+
+        Args:
+            embed (Embed): Embed object.
+            fields (Tuple[str, str]): The track names and track durations.
+            count (int): Number of songs described.
+
+        Returns:
+            embed (Embed): Embed object.
+        """
+        plurial: str = "s" if count > 1 else ""
+        return embed.add_field(name=f"Track{plurial}:", inline=True, value=fields[0]).add_field(
+            name=f"Duration{plurial}:", inline=True, value=fields[1]
+        )
+
     def get_songs_embed(
-        self, context: Context, songs: List[YoutubeSourceInfo], title: str, content: str, offset: int = 0
+        self, context: Context, songs: List[YoutubeSourceInfo], title: str, content: str, more: int = 0
     ) -> Embed:
         """
         Get an embed object with a description of all songs.
@@ -63,51 +254,55 @@ class Music(Cog):
             songs (List[YoutubeSource]): List of songs.
             title (str): Command title.
             content (str): response content.
+            more (int): Number of songs not displayed.
 
         Returns:
             embed (Embed): Embed object.
         """
-        track_names: str = ""
-        track_durations: str = ""
-
-        for index, song in enumerate(songs):
-            track_name: str = f"`#{index + offset + 1}` - `{song.title}`\n"
-
-            if len(track_name) >= 45:
-                track_name = f"{track_name[:41]}...`\n"
+        embed: Embed = self.add_songs_fields(
+            self.get_embed(context, title, content), self.get_songs_fields(songs), len(songs)
+        )
 
-            track_names += track_name
-            track_durations += f"`{timedelta(seconds=song.duration)}`\n"
+        if more:
+            embed.set_footer(text=f"... and {more} more.")
 
-        plurial: str = "s" if len(self.music_queue) > 1 else ""
-        embed: Embed
+        return embed
 
-        if not offset:
-            embed = self.get_embed(context, title if not offset else "", content if not offset else "")
-        else:
-            embed = Embed(color=Color.teal())
-        return embed.add_field(name=f"Track{plurial}:", inline=True, value=track_names).add_field(
-            name=f"Duration{plurial}:", inline=True, value=track_durations
-        )
+    def get_queue_pages(self, player: Player) -> int:
+        return max(1, -(-len(player.queue) // QUEUE_PAGE_SIZE))
 
-    def get_songs_embeds(
-        self, context: Context, songs: List[YoutubeSourceInfo], title: str, content: str
-    ) -> List[Embed]:
+    def get_queue_embed(self, context: Context, player: Player, page: int) -> Embed:
         """
-        Get a list of embed object with a description of all songs.
+        Get an embed object describing a page of the queue.
+        The fields of the pages are cached until the queue is modified.
 
         Args:
             context (Context): Context of the command.
-            songs (List[YoutubeSource]): List of songs.
-            title (str): Command title.
-            content (str): response content.
+            player (Player): Player of the guild.
+            page (int): Index of the page.
 
         Returns:
             embed (Embed): Embed object.
         """
-        total_duration: int = sum([song.duration for song in songs])
-        content = f"{content}\n\n**Total Duration:** `{timedelta(seconds=total_duration)}`\n"
-        return [self.get_songs_embed(context, songs[i : i + 20], title, content, i) for i in range(0, len(songs), 20)]
+        if player.pages_version != player.queue.version:
+            player.pages.clear()
+            player.pages_version = player.queue.version
+
+        fields: Optional[Tuple[str, str]] = player.pages.get(page)
+        start: int = page * QUEUE_PAGE_SIZE
+
+        if fields is None:
+            fields = player.pages[page] = self.get_songs_fields(
+                [entry.song for entry in player.queue.slice(start, start + QUEUE_PAGE_SIZE)], start
+            )
+
+        content: str = (
+            f"`Display` songs in the queue !\n\n**Total Duration:** `{timedelta(seconds=player.queue.duration)}`\n"
+        )
+        count: int = min(QUEUE_PAGE_SIZE, len(player.queue) - start)
+        return self.add_songs_fields(self.get_embed(context, "Queue", content), fields, count).set_footer(
+            text=f"Page {page + 1}/{self.get_queue_pages(player)}"
+        )
 
     ### RESPONSE ###
 
@@ -124,71 +319,129 @@ class Music(Cog):
         embed: Embed = self.get_embed(context, title, content, is_error)
         await send(context, embed=embed)
 
-    async def send_add_response(self, context: Context, songs: List[YoutubeSourceInfo]):
+    async def send_add_response(
+        self,
+        context: Context,
+        songs: List[YoutubeSourceInfo],
+        message: Optional[Message] = None,
+        failed: Optional[List[str]] = None,
+    ) -> Message:
         """
-        Send an embed response for the `add` command.
+        Send an embed response for the `add` command, or update it if it was already sent.
 
         Args:
             context (Context): Context of the command.
             songs (List[YoutubeSource]): List of songs added.
+            message (Optional[Message]): Previous response to update.
+            failed (Optional[List[str]]): Queries no song was found for.
+
+        Returns:
+            Message: The response message.
         """
         plurial: str = "s" if len(songs) > 1 else ""
-        embeds: List[Embed] = self.get_songs_embeds(
-            context, songs, "Add", f"`Added` {len(songs)} song{plurial} to the queue !"
+        total_duration: int = sum([song.duration for song in songs])
+        content: str = (
+            f"`Added` {len(songs)} song{plurial} to the queue !\n\n"
+            f"**Total Duration:** `{timedelta(seconds=total_duration)}`\n"
+        )
+        embed: Embed = self.get_songs_embed(
+            context, songs[:QUEUE_PAGE_SIZE], "Add", content, max(0, len(songs) - QUEUE_PAGE_SIZE)
         )
-        await send(context, embeds=embeds)
+
+        if failed:
+            lines: List[str] = [f"`{query[:SHORT_TITLE_LENGTH]}`\n" for query in failed]
+            while len("".join(lines)) > ADD_FAILED_FIELD_SIZE - 4:
+                lines.pop()
+            embed.add_field(
+                name="Not Found:", inline=False, value="".join(lines) + ("..." if len(lines) < len(failed) else "")
+            )
+
+        if message is not None:
+            return await message.edit(embed=embed)
+
+        return await send(context, embed=embed)
 
     async def send_queue_response(self, context: Context):
         """
-        Send an embed response for the `add` command.
+        Send an embed response for the `queue` command, displaying its first page.
 
         Args:
             context (Context): Context of the command.
-            songs (List[YoutubeSource]): List of songs added.
         """
-        songs: List[YoutubeSourceInfo] = [song for song, _ in self.music_queue]
-        embeds: List[Embed] = self.get_songs_embeds(context, songs, "Queue", f"`Display` songs in the queue !")
+        embed: Embed = self.get_queue_embed(context, self.get_player(context), 0)
         view: QueueView = QueueView(self, context)
-        await send(context, embeds=embeds, view=view)
+        await send(context, embed=embed, view=view)
 
-    async def send_play_response(self, context: Context, song: YoutubeSourceInfo):
+    def update_panel(self, player: Player):
         """
-        Send an embed response for the `play` command.
+        Show the current song of a player in the now playing panel of the channel where it was requested.
+        The panel is edited in place, and moved to another channel only when a song is requested from there.
 
         Args:
-            context (Context): Context of the command.
-            songs (YoutubeSource): Song playing.
-        """
-        embed: Embed = (
-            self.get_embed(context, "Play", f"`Playing` next song in queue !", prefix=False)
-            .add_field(name="Track:", inline=True, value=f"`{song.title}`")
+            player (Player): Player of the guild.
+        """
+        entry: Optional[QueueEntry] = player.current
+
+        if entry is None:
+            if player.panel is not None:
+                embed: Embed = Embed(
+                    title=f"{MODULE_EMOJIS['Music']} Music - Play",
+                    color=Color.teal(),
+                    description="The queue is empty ...",
+                )
+                player.panel.update(embed=embed, view=None)
+            return
+
+        context: Context = entry.context
+
+        if context.channel is None:
+            return
+
+        if player.panel is None or player.panel.channel != context.channel:
+            if player.panel is not None:
+                player.panel.close()
+            player.panel = Panel(context.channel)
+
+        paused: bool = player.voice_client is not None and player.voice_client.is_paused()
+        embed = (
+            self.get_embed(context, "Play", "`Paused` the song !" if paused else "`Playing` the song !", prefix=False)
+            .add_field(name="Track:", inline=True, value=f"`{entry.song.title}`")
             .add_field(name="Requested By:", inline=True, value=context.author.mention)
-            .add_field(name="Duration:", inline=True, value=f"`{timedelta(seconds=song.duration)}`")
-            .set_thumbnail(url=song.thumbnail)
+            .add_field(name="Duration:", inline=True, value=f"`{entry.song.duration_text}`")
+            .set_thumbnail(url=entry.song.thumbnail)
         )
+        player.panel.update(embed=embed, view=PlayView(self, context, paused))
 
-        view: PlayView = PlayView(self, context)
-        await context.channel.send(embed=embed, view=view)
-
-    async def send_search_response(self, context: Context, query: str, songs: List[YoutubeSourceInfo]):
+    async def send_search_response(
+        self, context: Context, query: str, songs: List[YoutubeSourceInfo], message: Optional[Message] = None
+    ) -> Message:
         """
-        Send an embed response for the `search` command.
+        Send an embed response for the `search` command, or update it if it was already sent.
 
         Args:
             context (Context): Context of the command.
-            songs (List[YoutubeSource]): List of songs added.
+            query (str): The searched query.
+            songs (List[YoutubeSource]): List of songs found.
+            message (Optional[Message]): Previous response to update.
+
+        Returns:
+            Message: The response message.
         """
         embed: Embed = self.get_songs_embed(context, songs, "Search", f"`Search` results for `{query}` !")
         view: SearchView = SearchView(self, context, songs)
-        await send(context, embed=embed, view=view)
+
+        if message is not None:
+            return await message.edit(embed=embed, view=view)
+
+        return await send(context, embed=embed, view=view)
 
     ### LISTENERS ###
 
     @Cog.listener()
     async def on_voice_state_update(self, member: Member, before: VoiceState, after: VoiceState):
         f"""
-        Listener function used to disconnect the bot after a {INACTIVITY_TIMEOUT} min period of inactivity.
-        (asynchronous)
+        Listener function starting the inactivity timer of the bot when it joins a channel,
+        it is disconnected after a {INACTIVITY_TIMEOUT} sec period of inactivity. (asynchronous)
 
         Args:
             member (Member): Member that updated his voice state.
@@ -198,27 +451,42 @@ class Music(Cog):
         if not client.user or member.id != client.user.id:
             return
 
-        if before.channel or not after.channel:
-            self.music_queue = []
+        if not after.channel:
+            self.idle.disarm(member.guild.id)
+            self.players.remove(member.guild.id)
             return
 
-        assert after.channel.guild is not None
-        assert after.channel.guild.voice_client is not None
+        if before.channel:
+            return
 
-        time: int = INACTIVITY_WAIT_INTERVAL
+        self.idle.arm(after.channel.guild.id)
 
-        await asyncio.sleep(INACTIVITY_WAIT_INTERVAL)
+    def update_idle(self, player: Player):
+        """
+        Start the inactivity timer of a player once it stopped playing with an empty queue, stop it otherwise.
 
-        while self.voice_channel is not None and self.voice_channel.is_connected():
-            await asyncio.sleep(INACTIVITY_WAIT_INTERVAL)
+        Args:
+            player (Player): Player of the guild.
+        """
+        if player.is_connected() and not player.voice_client.is_playing() and not player.queue:  # type: ignore
+            self.idle.arm(player.guild_id)
+        else:
+            self.idle.disarm(player.guild_id)
 
-            if not self.voice_channel.is_playing() and not self.music_queue:
-                time += INACTIVITY_WAIT_INTERVAL
-            else:
-                time = 0
+    async def on_idle(self, guild_id: int):
+        """
+        Disconnect the voice client of a guild once it stayed idle for too long. (asynchronous)
 
-            if time == INACTIVITY_TIMEOUT:
-                await self.voice_channel.disconnect(force=True)
+        Args:
+            guild_id (int): Id of the guild.
+        """
+        if guild_id not in self.players:
+            return
+
+        player: Player = self.players.get(guild_id)
+
+        if player.is_connected() and not player.voice_client.is_playing() and not player.queue:  # type: ignore
+            await player.voice_client.disconnect(force=True)  # type: ignore
 
     ### COMMANDS ###
 
@@ -235,16 +503,18 @@ class Music(Cog):
             return
 
         channel = member.voice.channel
+        player: Player = self.get_player(context)
 
-        if self.voice_channel and self.voice_channel.is_connected() and self.voice_channel.channel == channel:
+        if player.is_connected() and player.voice_client.channel == channel:  # type: ignore
             return
-        elif self.voice_channel is None or not self.voice_channel.is_connected():
+        elif not player.is_connected():
+            load_opus()
             try:
-                self.voice_channel = await member.voice.channel.connect()
+                player.voice_client = await member.voice.channel.connect()
             except asyncio.TimeoutError:
                 await self.send_response(context, "Connect", f"Failed to `connect` to the {channel} channel !", True)
         else:
-            await self.voice_channel.move_to(member.voice.channel)
+            await player.voice_client.move_to(member.voice.channel)  # type: ignore
 
         await self.send_response(context, "Connect", f"`Connected` the Bot to the {channel} channel !")
 
@@ -256,36 +526,97 @@ class Music(Cog):
         if context.interaction and not context.interaction.response.is_done():
             await context.interaction.response.defer()
 
-        if not self.voice_channel:
+        player: Player = self.get_player(context)
+
+        if not player.voice_client:
             await self.send_response(context, "Disconnect", "The bot is not connected to a channel ...", True)
             return
 
-        await self.voice_channel.disconnect()
+        await player.voice_client.disconnect()
         await self.send_response(context, "Disconnect", "`Disconnected` the bot !")
 
-    async def play_music(self):
+    async def play_music(self, player: Player):
         """
-        Get the next music in the queue and play it.
+        Get the next music in the guild queue and play it.
+
+        Args:
+            player (Player): Player of the guild.
         """
-        if not self.music_queue or not self.voice_channel:
+        player.current = None
+        self.update_idle(player)
+
+        if not player.queue or not player.voice_client:
+            self.update_panel(player)
             return
 
-        context: Context
-        info: YoutubeSourceInfo
-        info, context = self.music_queue.pop(0)
+        entry: QueueEntry = player.queue.popleft()
+        player.offset, player.seek = player.seek, 0
+
+        source: Optional[AudioSource] = await player.prefetcher.prepare(entry.song, player.volume, player.offset)
+        player.prefetch()
 
-        source: Optional[YoutubeSource] = await info.prepare()
+        if not player.voice_client or not player.voice_client.is_connected():
+            return
 
         if source:
-            client.loop.create_task(self.send_play_response(context, info))
-            self.voice_channel.play(
-                source,
-                after=lambda e: asyncio.run_coroutine_threadsafe(self.play_music(), client.loop)
-                if not e
-                else print(f"Error: {e}"),
-            )
+            player.current = entry
+            audio_cache.record_play(entry.song)
+            search_index.record_play(entry.song)
+            player.voice_client.play(MonitoredSource(source, player.stats), after=lambda e: self.after_play(player, e))
+            self.update_panel(player)
         else:
-            asyncio.run_coroutine_threadsafe(self.play_music(), client.loop)
+            playback_errors.inc("resolve")
+            asyncio.run_coroutine_threadsafe(self.play_music(player), client.loop)
+
+    def after_play(self, player: Player, error: Optional[Exception]):
+        """
+        Play the next song once the current one ended, called from the voice client thread.
+
+        Args:
+            player (Player): Player of the guild.
+            error (Optional[Exception]): The error that stopped the song, if any.
+        """
+        if error:
+            playback_errors.inc("playback")
+            print(f"Error: {error}")
+            client.loop.call_soon_threadsafe(self.update_idle, player)
+            return
+
+        asyncio.run_coroutine_threadsafe(self.play_music(player), client.loop)
+
+    def set_paused(self, player: Player, paused: bool):
+        """
+        Pause or resume the song of a player.
+
+        Args:
+            player (Player): Player of the guild.
+            paused (bool): True to pause the song, False to resume it.
+        """
+        if player.voice_client is None:
+            return
+
+        if paused:
+            player.voice_client.pause()
+        else:
+            player.voice_client.resume()
+
+        self.update_idle(player)
+        self.update_panel(player)
+
+    def clear_queue(self, player: Player):
+        """
+        Clear the queue of a player and stop its current song.
+
+        Args:
+            player (Player): Player of the guild.
+        """
+        player.queue.clear()
+        player.prefetch()
+
+        if player.voice_client is not None and player.voice_client.is_playing():
+            player.voice_client.stop()
+        else:
+            self.update_idle(player)
 
     @hybrid_command()  # type: ignore
     async def play(self, context: Context, query: Optional[str]):
@@ -296,40 +627,147 @@ class Music(Cog):
             await context.interaction.response.defer()
 
         await self.connect(context)
-        if not self.voice_channel:
+
+        player: Player = self.get_player(context)
+
+        if not player.voice_client:
             return
 
         if not query:
-            if not self.voice_channel.is_playing() and self.music_queue:
-                self.voice_channel.resume()
+            if not player.voice_client.is_playing() and player.queue:
+                player.voice_client.resume()
                 await self.send_response(context, "Play", "`Resumed` the music !")
-            elif self.music_queue:
+            elif player.queue:
                 await self.send_response(context, "Play", "The queue is empty ...")
             else:
                 await self.send_response(context, "Play", "The music is already playing ...")
             return
 
-        await context.invoke(client.get_command("add"), query=query)  # type: ignore
+        await self.enqueue(context, query, autoplay=True)
 
-        if not self.voice_channel.is_playing() and not self.voice_channel.is_paused():
-            asyncio.run_coroutine_threadsafe(self.play_music(), client.loop)
+    async def enqueue(self, context: Context, query: str, autoplay: bool = False):
+        """
+        Add the songs found for a query to the queue as soon as they are extracted,
+        updating the `add` response progressively.
+
+        Args:
+            context (Context): Context of the command.
+            query (str): The query or URL to search for.
+            autoplay (bool): Start playing as soon as the first song is queued.
+        """
+        player: Player = self.get_player(context)
+        songs: List[YoutubeSourceInfo] = []
+        message: Optional[Message] = None
+        sent: int = 0
+        updated: float = 0
+
+        async for batch in YoutubeSourceInfo.stream(query):
+            player.queue.extend(batch, context)
+            player.prefetch()
+            songs.extend(batch)
+            search_index.add(batch)
+
+            voice_client: Optional[VoiceClient] = player.voice_client
+
+            if autoplay and len(songs) == len(batch) and voice_client:
+                if not voice_client.is_playing() and not voice_client.is_paused():
+                    asyncio.run_coroutine_threadsafe(self.play_music(player), client.loop)
+
+            if message is None or time.monotonic() - updated >= ADD_RESPONSE_UPDATE_INTERVAL:
+                message = await self.send_add_response(context, songs, message)
+                sent, updated = len(songs), time.monotonic()
+
+        if not songs:
+            await self.send_response(context, "Add", "Could not find the song(s) ... Try other keywords / URLs.", True)
+        elif sent != len(songs):
+            await self.send_add_response(context, songs, message)
+
+    async def enqueue_batch(self, context: Context, queries: List[str]):
+        """
+        Resolve several queries concurrently and add their songs to the queue in the order of the queries,
+        then send a single response listing the added songs and the queries nothing was found for.
+
+        Args:
+            context (Context): Context of the command.
+            queries (List[str]): The queries or URLs to search for.
+        """
+        player: Player = self.get_player(context)
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(ADD_BATCH_CONCURRENCY)
+
+        async def resolve(query: str) -> List[YoutubeSourceInfo]:
+            async with semaphore:
+                return await YoutubeSourceInfo.search(query)
+
+        tasks: List[asyncio.Task] = [asyncio.create_task(resolve(query)) for query in queries]
+        songs: List[YoutubeSourceInfo] = []
+        failed: List[str] = []
+
+        for query, task in zip(queries, tasks):
+            try:
+                found: List[YoutubeSourceInfo] = await task
+            except Exception as e:
+                print(f"Error: {e}")
+                found = []
+
+            if not found:
+                failed.append(query)
+                continue
+
+            player.queue.extend(found, context)
+            player.prefetch()
+            songs.extend(found)
+            search_index.add(found)
+
+        if not songs:
+            await self.send_response(context, "Add", "Could not find the song(s) ... Try other keywords / URLs.", True)
+        else:
+            await self.send_add_response(context, songs, failed=failed)
 
     @hybrid_command()  # type: ignore
-    async def add(self, context: Context, query: str):
+    async def add(self, context: Context, file: Optional[Attachment] = None, *, query: Optional[str] = None):
         """
-        Add a song or a playlist to the queue, can be used with keyword and URLs.
+        Add songs or playlists to the queue, from keywords or URLs separated by lines or `;`, or a file.
         """
         if context.interaction and not context.interaction.response.is_done():
             await context.interaction.response.defer()
 
-        songs: List[YoutubeSourceInfo] = await YoutubeSourceInfo.search(query)
+        queries: List[str] = split_queries(query or "")
+
+        if file is not None:
+            if file.size > ADD_BATCH_FILE_SIZE:
+                await self.send_response(
+                    context, "Add", f"The file exceeds `{ADD_BATCH_FILE_SIZE // 2**10}` KiB ...", True
+                )
+                return
+            queries += split_queries((await file.read()).decode(errors="replace"))
+
+        if not queries:
+            await self.send_response(context, "Add", "Give keywords / URLs, or a file listing them ...", True)
+        elif len(queries) > ADD_BATCH_LIMIT:
+            await self.send_response(
+                context, "Add", f"At most `{ADD_BATCH_LIMIT}` songs can be added at once ...", True
+            )
+        elif len(queries) == 1 and file is None:
+            await self.enqueue(context, queries[0])
+        else:
+            await self.enqueue_batch(context, queries)
 
-        if not songs:
-            await self.send_response(context, "Add", "Could not find the song(s) ... Try other keywords / URLs.", True)
-            return
+    @add.autocomplete("query")
+    @play.autocomplete("query")
+    async def query_autocomplete(self, interaction: Interaction, current: str) -> List[Choice[str]]:
+        """
+        Suggest the tracks matching the query being typed in the `play` and `add` commands,
+        a picked suggestion is queued from its URL without searching it again. (asynchronous)
 
-        self.music_queue.extend([(song, context) for song in songs])
-        await self.send_add_response(context, songs)
+        Args:
+            interaction (Interaction): The autocomplete interaction.
+            current (str): The query typed so far.
+
+        Returns:
+            List[Choice[str]]: The titles of the suggested tracks, with their URL as value.
+        """
+        songs: List[YoutubeSourceInfo] = await autocomplete.suggest(interaction.user.id, current)
+        return [Choice(name=song.title[:100], value=song.url) for song in songs if len(song.url) <= 100]
 
     @hybrid_command()  # type: ignore
     async def search(self, context: Context, query: str):
@@ -339,13 +777,22 @@ class Music(Cog):
         if context.interaction and not context.interaction.response.is_done():
             await context.interaction.response.defer()
 
-        songs: List[YoutubeSourceInfo] = await YoutubeSourceInfo.search(query, search=True)
+        local: List[YoutubeSourceInfo] = search_index.search(query, SEARCH_RESULTS)
+        task: asyncio.Task = asyncio.create_task(YoutubeSourceInfo.search(query, search=True))
+        message: Optional[Message] = await self.send_search_response(context, query, local) if local else None
+
+        found: List[YoutubeSourceInfo] = await task
+        search_index.add(found)
+
+        ids: Set[str] = {song.id for song in local}
+        songs: List[YoutubeSourceInfo] = (
+            local[: SEARCH_RESULTS // 2] + [song for song in found if song.id not in ids] + local[SEARCH_RESULTS // 2 :]
+        )[:SEARCH_RESULTS]
 
         if not songs:
             await self.send_response(context, "Search", "Could not find any song ... Try other keywords / URLs.", True)
-            return
-
-        await self.send_search_response(context, query, songs)
+        elif message is None or [song.id for song in songs] != [song.id for song in local]:
+            await self.send_search_response(context, query, songs, message)
 
     @hybrid_command()  # type: ignore
     async def pause(self, context: Context):
@@ -355,11 +802,13 @@ class Music(Cog):
         if context.interaction and not context.interaction.response.is_done():
             await context.interaction.response.defer()
 
-        if not self.voice_channel or self.voice_channel.is_paused():
+        player: Player = self.get_player(context)
+
+        if not player.voice_client or player.voice_client.is_paused():
             await self.send_response(context, "Pause", "The bot is not currently playing a song ...", True)
             return
 
-        self.voice_channel.pause()
+        self.set_paused(player, True)
         await self.send_response(context, "Pause", "`Paused` the bot !")
 
     @hybrid_command()  # type: ignore
@@ -370,11 +819,13 @@ class Music(Cog):
         if context.interaction and not context.interaction.response.is_done():
             await context.interaction.response.defer()
 
-        if not self.voice_channel or self.voice_channel.is_playing():
+        player: Player = self.get_player(context)
+
+        if not player.voice_client or player.voice_client.is_playing():
             await self.send_response(context, "Resume", "The bot is currently playing a song ...", True)
             return
 
-        self.voice_channel.resume()
+        self.set_paused(player, False)
         await self.send_response(context, "Resume", "`Resumed` the bot !")
 
     @hybrid_command()  # type: ignore
@@ -385,12 +836,14 @@ class Music(Cog):
         if context.interaction and not context.interaction.response.is_done():
             await context.interaction.response.defer()
 
-        if not self.voice_channel or not self.voice_channel.is_connected():
+        player: Player = self.get_player(context)
+
+        if not player.voice_client or not player.voice_client.is_connected():
             await self.send_response(context, "Skip", "The bot is currently not connected ...", True)
             return
 
         await self.send_response(context, "Skip", "`Skipped` the song !")
-        self.voice_channel.stop()
+        player.voice_client.stop()
 
     @hybrid_command()  # type: ignore
     async def clear(self, context: Context):
@@ -400,14 +853,13 @@ class Music(Cog):
         if context.interaction and not context.interaction.response.is_done():
             await context.interaction.response.defer()
 
-        if not self.voice_channel or not self.voice_channel.is_connected():
+        player: Player = self.get_player(context)
+
+        if not player.voice_client or not player.voice_client.is_connected():
             await self.send_response(context, "Clear", "The bot is currently not connected ...", True)
             return
 
-        if self.voice_channel.is_playing():
-            self.voice_channel.stop()
-
-        self.music_queue = []
+        self.clear_queue(player)
         await self.send_response(context, "Clear", "`Cleared` the queue !")
 
     @hybrid_command()  # type: ignore
@@ -418,16 +870,111 @@ class Music(Cog):
         if context.interaction and not context.interaction.response.is_done():
             await context.interaction.response.defer()
 
-        if not self.voice_channel or not self.voice_channel.is_connected():
+        player: Player = self.get_player(context)
+
+        if not player.voice_client or not player.voice_client.is_connected():
             await self.send_response(context, "Queue", "The bot is currently not connected ...", True)
             return
 
-        if not self.music_queue:
+        if not player.queue:
             await self.send_response(context, "Queue", "The queue is empty ...")
             return
 
         await self.send_queue_response(context)
 
+    @hybrid_command()  # type: ignore
+    async def shuffle(self, context: Context):
+        """
+        Shuffle the music queue.
+        """
+        if context.interaction and not context.interaction.response.is_done():
+            await context.interaction.response.defer()
+
+        player: Player = self.get_player(context)
+
+        if not player.queue:
+            await self.send_response(context, "Shuffle", "The queue is empty ...", True)
+            return
+
+        player.queue.shuffle()
+        player.prefetch()
+        await self.send_response(context, "Shuffle", "`Shuffled` the queue !")
+
+    @hybrid_command()  # type: ignore
+    async def volume(self, context: Context, volume: Optional[int]):
+        """
+        Display or change the volume of the bot, in percent between 0 and 200.
+        """
+        if context.interaction and not context.interaction.response.is_done():
+            await context.interaction.response.defer()
+
+        player: Player = self.get_player(context)
+
+        if volume is None:
+            await self.send_response(context, "Volume", f"The volume is set to `{round(player.volume * 100)}%`.")
+            return
+
+        if not 0 <= volume <= 200:
+            await self.send_response(context, "Volume", "The volume should be between `0` and `200` !", True)
+            return
+
+        player.volume = volume / 100
+        source: Optional[AudioSource] = player.voice_client.source if player.voice_client else None
+
+        if isinstance(source, MonitoredSource):
+            source = source.original
+
+        # Decoded sources apply the volume while playing, the Opus ones only when FFmpeg starts.
+        live: bool = isinstance(source, PCMVolumeTransformer) or isinstance(source, WorkerSource) and source.decoded
+
+        if live:
+            source.volume = player.volume  # type: ignore
+
+        if source is None or live:
+            await self.send_response(context, "Volume", f"`Set` the volume to `{volume}%` !")
+        else:
+            await self.send_response(context, "Volume", f"`Set` the volume to `{volume}%` from the next song !")
+
+    @hybrid_command()  # type: ignore
+    async def diag(self, context: Context):
+        """
+        Display the frame timing diagnostics of the current song and of the previous ones of the voice session.
+        """
+        if context.interaction and not context.interaction.response.is_done():
+            await context.interaction.response.defer()
+
+        player: Player = self.get_player(context)
+        source: Optional[AudioSource] = player.voice_client.source if player.voice_client else None
+
+        if not isinstance(source, MonitoredSource) or player.current is None:
+            await self.send_response(context, "Diagnostics", "No song is currently playing ...", True)
+            return
+
+        stats: FrameStats = source.stats
+        buffered: int = source.get_buffered()
+        buffered_text: str = f"{buffered} B"
+
+        if not source.is_opus():
+            buffered_text += f" ({buffered / Encoder.FRAME_SIZE * Encoder.FRAME_LENGTH:.0f} ms)"
+
+        def get_fields(stats: FrameStats) -> str:
+            return (
+                f"**Frames:** `{stats.frames}`\n"
+                f"**Read time:** `p50 {stats.get_read_time(50) * 1e3:.2f} ms / "
+                f"p99 {stats.get_read_time(99) * 1e3:.2f} ms / max {stats.max_read_time * 1e3:.2f} ms`\n"
+                f"**Jitter:** `{stats.jitter * 1e3:.2f} ms`\n"
+                f"**Underruns:** `{stats.missed}`\n"
+                f"**Stalls:** `{stats.stalls}`"
+            )
+
+        embed: Embed = (
+            self.get_embed(context, "Diagnostics", "`Displayed` the playback diagnostics !")
+            .add_field(name="Track:", inline=False, value=f"`{player.current.song.title}`")
+            .add_field(name="Current Song:", inline=True, value=f"{get_fields(stats)}\n**Buffered:** `{buffered_text}`")
+            .add_field(name="Previous Songs:", inline=True, value=get_fields(player.stats))
+        )
+        await send(context, embed=embed)
+
 
 async def setup(client: Client):
     await client.add_cog(Music())
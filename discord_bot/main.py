@@ -1,13 +1,33 @@
-from typing import Dict, List
+import asyncio
+import os
+import signal
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
 
 import click
 import discord
-from discord.ext.commands import Bot
+from discord.ext.commands import AutoShardedBot, Context
+
+from discord_bot.utils.cache import metadata_cache
+from discord_bot.utils.command_sync import COMMAND_SYNC_PATH, CommandSync
+from discord_bot.utils.journal import queue_journal
+from discord_bot.utils.loop_monitor import loop_monitor
+from discord_bot.utils.metrics import command_duration, metrics
+from discord_bot.utils.search_index import search_index
+from discord_bot.utils.sharding import (
+    ShardSupervisor,
+    get_process_path,
+    get_recommended_shard_count,
+    parse_shard_ids,
+    split_shards,
+)
+from discord_bot.utils.startup import startup
 
 MODULE_EMOJIS: Dict[str, str] = {"Gambling": "🎲", "Music": "🎶", "Help": "🫴"}
 
 
-class Client(Bot):
+class Client(AutoShardedBot):
+    warmed_up: bool
     _extensions: List[str] = [
         "discord_bot.extensions.gambling",
         "discord_bot.extensions.music",
@@ -15,26 +35,145 @@ class Client(Bot):
     ]
 
     def __init__(self):
-        super().__init__(command_prefix="!", intents=discord.Intents.all())
+        super().__init__(command_prefix="!", intents=discord.Intents.all(), shard_count=1)
+        self.warmed_up = False
+        self.before_invoke(self.start_command_timer)
+        self.after_invoke(self.stop_command_timer)
 
     async def setup_hook(self):
         self.remove_command("help")
+        await loop_monitor.start()
+        await metrics.start()
 
         for extension in self._extensions:
-            await self.load_extension(extension)
+            with startup.phase(f"load {extension}"):
+                await self.load_extension(extension)
+
+        path: str = get_process_path(COMMAND_SYNC_PATH, self.shard_ids)
+
+        with startup.phase("sync commands"):
+            guilds: List[discord.Guild] = [guild async for guild in self.fetch_guilds() if self.owns(guild.id)]
+            await CommandSync(self.tree, path).sync(guilds, sync_global=self.shard_ids is None or 0 in self.shard_ids)
+
+    async def on_ready(self):
+        """
+        Warm up the cogs in the background once the gateway is ready, so their slow imports and
+        initializations do not delay the startup nor the first command using them. (asynchronous)
+        """
+        if self.warmed_up:
+            return
+
+        self.warmed_up = True
+        startup.mark("ready")
+
+        for name, cog in self.cogs.items():
+            warm_up: Optional[Callable[[], Awaitable[None]]] = getattr(cog, "warm_up", None)
+            if warm_up is not None:
+                with startup.phase(f"warm up {name}"):
+                    await warm_up()
+
+        startup.report()
+
+    def owns(self, guild_id: int) -> bool:
+        """
+        Check if a guild is handled by the shards of this process.
 
-        async for guild in self.fetch_guilds():
-            self.tree.copy_global_to(guild=guild)
-            await self.tree.sync(guild=guild)
+        Args:
+            guild_id (int): Id of the guild.
+
+        Returns:
+            bool: True if one of the shards of the process receives the events of the guild.
+        """
+        if self.shard_count is None or self.shard_ids is None:
+            return True
+
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    async def close(self):
+        await queue_journal.close()
+        metadata_cache.close()
+        search_index.close()
+        await metrics.stop()
+        await loop_monitor.stop()
+        await super().close()
+
+    async def start_command_timer(self, context: Context):
+        setattr(context, "started", time.perf_counter())
+
+    async def stop_command_timer(self, context: Context):
+        started: Optional[float] = getattr(context, "started", None)
+
+        if context.command is not None and started is not None:
+            command_duration.observe(context.command.qualified_name, value=time.perf_counter() - started)
 
 
 client = Client()
 
 
+def close(*args):
+    """
+    Close the client on SIGTERM, so the queues are saved and the gateway connection is closed cleanly.
+    """
+    if not isinstance(client.loop, asyncio.AbstractEventLoop):
+        raise SystemExit(0)
+
+    asyncio.run_coroutine_threadsafe(client.close(), client.loop)
+
+
+def run(token: str, shard_count: Optional[int], shard_ids: Optional[List[int]], index: int = 0):
+    """
+    Run the bot with some shards in the current process.
+
+    Args:
+        token (str): Token of the bot.
+        shard_count (Optional[int]): Total number of shards, the recommended one when None.
+        shard_ids (Optional[List[int]]): Shards run by the process, all of them when None.
+        index (int): Index of the process, offsetting the port of its metrics endpoint.
+
+    The SQLite files of the process are suffixed by its first shard, so each process writes its own files.
+    """
+    if metrics.port:
+        metrics.port += index
+
+    metadata_cache.path = get_process_path(metadata_cache.path, shard_ids)
+    queue_journal.path = get_process_path(queue_journal.path, shard_ids)
+    search_index.path = get_process_path(search_index.path, shard_ids)
+    signal.signal(signal.SIGTERM, close)
+
+    client.shard_count = shard_count
+    client.shard_ids = shard_ids
+    client.run(token)
+
+
 @click.command()
 @click.argument("token", type=click.STRING)
-def main(token: str):
-    client.run(token)
+@click.option("--shard-count", type=click.INT, default=1, help="Total number of shards, 0 for the recommended one.")
+@click.option("--shard-ids", type=click.STRING, help="Shards run by this deployment, like `0-3,8`. Default: all.")
+@click.option("--processes", type=click.INT, default=1, help="Number of processes sharing the shards.")
+@click.option("--startup-report", is_flag=True, help="Log the duration of the startup phases and imports.")
+def main(token: str, shard_count: int, shard_ids: Optional[str], processes: int, startup_report: bool):
+    if startup_report:
+        os.environ["STARTUP_REPORT"] = "1"
+        startup.enable()
+
+    ids: Optional[List[int]] = parse_shard_ids(shard_ids) if shard_ids else None
+
+    if ids is not None and shard_count and ids[-1] >= shard_count:
+        raise click.BadParameter(f"shard ids should be lower than the shard count {shard_count}.")
+
+    if processes <= 1:
+        run(token, shard_count or None, ids)
+        return
+
+    discord.utils.setup_logging()
+
+    if not shard_count:
+        shard_count = asyncio.run(get_recommended_shard_count(token))
+
+    from discord_bot.cli import run as run_process
+
+    groups: List[List[int]] = split_shards(ids if ids is not None else list(range(shard_count)), processes)
+    ShardSupervisor(run_process, token, shard_count, groups).run()
 
 
 if __name__ == "__main__":
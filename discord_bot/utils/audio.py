@@ -0,0 +1,134 @@
+import importlib.util
+import math
+import os
+from typing import List, Optional
+
+# numpy is only imported by the first song decoded by the bot, it is slow to import and not needed at startup.
+NUMPY: bool = importlib.util.find_spec("numpy") is not None
+TARGET_LOUDNESS: float = float(os.environ.get("TARGET_LOUDNESS", -14))
+MAX_NORMALIZATION_GAIN: float = 10
+SAMPLE_RATE: int = 48000
+CHANNELS: int = 2
+BLOCK_DURATION: float = 0.4
+ABSOLUTE_GATE: float = -70
+RELATIVE_GATE: float = -10
+
+# ITU-R BS.1770 K-weighting filters at 48 kHz: high shelf followed by a high pass.
+K_WEIGHTING_FILTERS: List[tuple] = [
+    ((1.53512485958697, -2.69169618940638, 1.19839281085285), (1.0, -1.69065929318241, 0.73248077421585)),
+    ((1.0, -2.0, 1.0), (1.0, -1.99004745483398, 0.99007225036621)),
+]
+
+
+def load_numpy():
+    """
+    Import numpy ahead of the first decoded song, so the voice thread does not wait for it.
+    """
+    if NUMPY:
+        import numpy  # noqa: F401
+
+
+def scale(data: bytes, gain: float) -> bytes:
+    """
+    Multiply 16 bits stereo PCM samples by a gain, clipping the result.
+    The whole buffer is processed at once, so batching several frames amortizes the call overhead.
+
+    Args:
+        data (bytes): The PCM samples.
+        gain (float): The gain to apply.
+
+    Returns:
+        bytes: The scaled samples.
+    """
+    if not NUMPY:
+        import audioop
+
+        return audioop.mul(data, 2, gain)
+
+    import numpy
+
+    samples = numpy.frombuffer(data, dtype=numpy.int16).astype(numpy.float32)
+    samples *= gain
+    numpy.clip(samples, -32768, 32767, out=samples)
+    return samples.astype(numpy.int16).tobytes()
+
+
+def get_k_weighting(size: int):
+    """
+    Get the power response of the K-weighting filters on the bins of a real FFT.
+
+    Args:
+        size (int): Number of samples given to the FFT.
+
+    Returns:
+        numpy.ndarray: The power gain of each bin.
+    """
+    import numpy
+
+    z = numpy.exp(-1j * 2 * math.pi * numpy.fft.rfftfreq(size, 1 / SAMPLE_RATE) / SAMPLE_RATE)
+    response = numpy.ones_like(z)
+
+    for b, a in K_WEIGHTING_FILTERS:
+        response *= (b[0] + b[1] * z + b[2] * z**2) / (a[0] + a[1] * z + a[2] * z**2)
+
+    return numpy.abs(response) ** 2
+
+
+def get_loudness(data: bytes) -> Optional[float]:
+    """
+    Measure the gated loudness of 16 bits stereo PCM samples, following EBU R128 on non overlapping blocks.
+    The K-weighting is applied in the frequency domain so every block is processed with vectorized operations.
+
+    Args:
+        data (bytes): The PCM samples.
+
+    Returns:
+        Optional[float]: The loudness in LUFS, None if it cannot be measured.
+    """
+    if not NUMPY:
+        return None
+
+    import numpy
+
+    block: int = int(SAMPLE_RATE * BLOCK_DURATION)
+    samples = numpy.frombuffer(data, dtype=numpy.int16)
+    blocks: int = len(samples) // (CHANNELS * block)
+
+    if not blocks:
+        return None
+
+    # Shape: (blocks, channels, samples)
+    signal = samples[: blocks * block * CHANNELS].reshape(blocks, block, CHANNELS).transpose(0, 2, 1) / 32768
+    spectrum = numpy.abs(numpy.fft.rfft(signal, axis=-1)) ** 2
+    spectrum[..., 1 : (block + 1) // 2] *= 2
+
+    # Parseval: mean square of each weighted block, summed over the channels.
+    energies = (spectrum * get_k_weighting(block)).sum(axis=(1, 2)) / block**2
+    loudness = -0.691 + 10 * numpy.log10(numpy.maximum(energies, 1e-12))
+
+    gated = energies[loudness > ABSOLUTE_GATE]
+    if not len(gated):
+        return None
+
+    threshold: float = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE
+    gated = energies[(loudness > ABSOLUTE_GATE) & (loudness > threshold)]
+    return -0.691 + 10 * math.log10(gated.mean())
+
+
+def get_normalization_gain(data: bytes) -> float:
+    """
+    Get the gain bringing samples to the target loudness.
+
+    Args:
+        data (bytes): The PCM samples of the analysis window.
+
+    Returns:
+        float: The linear gain, 1 if the loudness cannot be measured.
+    """
+    loudness: Optional[float] = get_loudness(data)
+
+    if loudness is None:
+        return 1
+
+    gain: float = max(-MAX_NORMALIZATION_GAIN, min(MAX_NORMALIZATION_GAIN, TARGET_LOUDNESS - loudness))
+    return 10 ** (gain / 20)
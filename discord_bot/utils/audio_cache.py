@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Set
+
+from discord_bot.utils.cache import LRUCache
+from discord_bot.utils.extractor import Extractor
+from discord_bot.utils.youtube import YoutubeSourceInfo
+
+AUDIO_CACHE_DIR: Optional[str] = os.environ.get("AUDIO_CACHE_DIR")
+AUDIO_CACHE_SIZE: int = int(os.environ.get("AUDIO_CACHE_SIZE", 2048)) * 2**20
+AUDIO_CACHE_THRESHOLD: int = int(os.environ.get("AUDIO_CACHE_THRESHOLD", 3))
+AUDIO_CACHE_DOWNLOADS: int = int(os.environ.get("AUDIO_CACHE_DOWNLOADS", 1))
+AUDIO_CACHE_EXTENSION: str = "opus"
+AUDIO_CACHE_PLAYS_SIZE: int = 10000
+AUDIO_CACHE_PLAYS_TTL: float = 7 * 24 * 60 * 60
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class AudioCache:
+    """
+    Opt-in disk cache of the audio of frequently played songs.
+
+    Songs played more than `threshold` times are downloaded in the background as Opus files,
+    and the least recently played files are evicted once the cache exceeds its size.
+    Plays are only counted for the songs played in the last week, and for a bounded number of songs.
+    The downloads run in their own bounded pool, so they never hold the workers extracting the queried songs.
+    """
+
+    directory: Optional[str]
+    size: int
+    threshold: int
+    plays: LRUCache[str, int]
+    files: Dict[str, int]
+    downloading: Set[str]
+    downloader: Extractor
+    youtube_options: Dict
+    _loaded: bool
+
+    def __init__(
+        self,
+        directory: Optional[str] = AUDIO_CACHE_DIR,
+        size: int = AUDIO_CACHE_SIZE,
+        threshold: int = AUDIO_CACHE_THRESHOLD,
+        downloads: int = AUDIO_CACHE_DOWNLOADS,
+    ):
+        self.directory = directory
+        self.size = size
+        self.threshold = threshold
+        self.plays = LRUCache(AUDIO_CACHE_PLAYS_SIZE, AUDIO_CACHE_PLAYS_TTL)
+        self.files = {}
+        self.downloading = set()
+        self.downloader = Extractor(workers=downloads, processes=False, max_in_flight=downloads)
+        self._loaded = False
+        self.youtube_options = {
+            "format": "bestaudio[acodec=opus]/bestaudio*/best",
+            "noplaylist": True,
+            "outtmpl": os.path.join(directory or "", "%(id)s.%(ext)s"),
+            "quiet": True,
+            "ratelimit": 5000000,
+            "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": AUDIO_CACHE_EXTENSION}],
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def get_path(self, id: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, f"{id}.{AUDIO_CACHE_EXTENSION}")
+
+    def load(self):
+        """
+        Index the files already present in the cache directory.
+        """
+        if self._loaded or self.directory is None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        for entry in os.scandir(self.directory):
+            id, extension = os.path.splitext(entry.name)
+            if entry.is_file() and extension == f".{AUDIO_CACHE_EXTENSION}":
+                self.files[id] = entry.stat().st_size
+
+        self._loaded = True
+
+    def get(self, song: YoutubeSourceInfo, play: bool = False) -> Optional[str]:
+        """
+        Get the path of the cached audio of a song.
+
+        Args:
+            song (YoutubeSourceInfo): The song.
+            play (bool): The song is about to be played, mark its file as recently played.
+                Upcoming songs are only looked up, so the eviction order follows the plays.
+
+        Returns:
+            Optional[str]: The path of the audio file, None on a miss.
+        """
+        if not self.enabled or not song.id:
+            return None
+
+        self.load()
+
+        if song.id not in self.files:
+            return None
+
+        path: str = self.get_path(song.id)
+
+        if not play:
+            return path
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            del self.files[song.id]
+            return None
+
+        return path
+
+    def record_play(self, song: YoutubeSourceInfo):
+        """
+        Count a play of a song, downloading it in the background once it is played more than `threshold` times.
+
+        Args:
+            song (YoutubeSourceInfo): The song played.
+        """
+        if not self.enabled or not song.id:
+            return
+
+        self.load()
+        plays: int = (self.plays.get(song.id) or 0) + 1
+        self.plays.set(song.id, plays)
+
+        if plays > self.threshold and song.id not in self.files and song.id not in self.downloading:
+            self.downloading.add(song.id)
+            asyncio.get_running_loop().create_task(self.download(song))
+
+    async def download(self, song: YoutubeSourceInfo):
+        """
+        Download the audio of a song into the cache. (asynchronous)
+
+        Args:
+            song (YoutubeSourceInfo): The song.
+        """
+        try:
+            data: Any = await self.downloader.extract("audio_cache", self.youtube_options, song.url, download=True)
+            path: str = self.get_path(song.id)
+
+            if data is None or not os.path.isfile(path):
+                return
+
+            self.files[song.id] = os.path.getsize(path)
+            self.evict()
+        except Exception as e:
+            logger.warning("Failed to cache the audio of %s: %s", song.url, e)
+        finally:
+            self.downloading.discard(song.id)
+
+    def evict(self):
+        """
+        Remove the least recently played files until the cache fits in its size.
+        """
+        total: int = sum(self.files.values())
+
+        if total <= self.size:
+            return
+
+        def last_played(id: str) -> float:
+            try:
+                return os.path.getmtime(self.get_path(id))
+            except FileNotFoundError:
+                return time.time() - 2**32
+
+        for id in sorted(self.files, key=last_played):
+            if total <= self.size:
+                break
+
+            total -= self.files.pop(id)
+
+            try:
+                os.remove(self.get_path(id))
+            except FileNotFoundError:
+                pass
+
+
+audio_cache: AudioCache = AudioCache()
@@ -0,0 +1,337 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+from multiprocessing.connection import Connection
+from multiprocessing.reduction import recv_handle, send_handle
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+
+from discord import AudioSource, PCMVolumeTransformer, opus
+from discord.opus import Encoder
+
+from discord_bot.utils.metrics import Gauge, Labels, metrics
+from discord_bot.utils.youtube import DEFAULT_VOLUME, LOUDNESS_NORMALIZATION, OPUS_PASSTHROUGH, Stream, YoutubeSource
+
+AUDIO_WORKERS: int = int(os.environ.get("AUDIO_WORKERS", 0))
+OPUS_LIBRARY_PATH: Optional[str] = os.environ.get("OPUS_LIBRARY_PATH")
+PACKET_HEADER_SIZE: int = 2
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+Target = Union[Stream, str]
+
+
+def is_decoded(target: Target) -> bool:
+    """
+    Check if the audio of a song is decoded to PCM, or if its Opus packets are passed through.
+
+    Args:
+        target (Target): Resolved stream, or path of a cached file.
+
+    Returns:
+        bool: True if the audio is decoded, its volume can then be changed while playing.
+    """
+    if not OPUS_PASSTHROUGH or LOUDNESS_NORMALIZATION:
+        return True
+
+    return not isinstance(target, str) and target.codec != "opus"
+
+
+def _encode(target: Target, volume: float, start: float, fd: int, volumes: Dict[int, float], id: int):
+    """
+    Run the FFmpeg pipeline of a song and write its Opus packets, prefixed by their size, into a pipe.
+    The pipe buffer bounds how far the worker reads ahead. The pipeline stops once the reader closed the pipe,
+    and the pipe is closed whatever happens, even if the pipeline could not start, so the reader never waits forever.
+
+    Args:
+        target (Target): Resolved stream, or path of a cached file.
+        volume (float): Initial volume of the song.
+        start (float): Position in seconds the song starts from.
+        fd (int): Write end of the pipe.
+        volumes (Dict[int, float]): Volume changes requested by the main process, by stream id.
+        id (int): Id of the stream.
+    """
+    source: Optional[AudioSource] = None
+    pipe: Optional[IO[bytes]] = None
+
+    try:
+        source = (
+            YoutubeSource.from_file(target, volume, start)
+            if isinstance(target, str)
+            else YoutubeSource.from_stream(target, volume, start)
+        )
+        encoder: Optional[Encoder] = None if source.is_opus() else Encoder()
+        pipe = os.fdopen(fd, "wb", buffering=0)
+
+        while data := source.read():
+            if isinstance(source, PCMVolumeTransformer) and id in volumes:
+                source.volume = volumes.pop(id)
+
+            packet: bytes = data if encoder is None else encoder.encode(data, Encoder.SAMPLES_PER_FRAME)
+            pipe.write(len(packet).to_bytes(PACKET_HEADER_SIZE, "little") + packet)
+    except BrokenPipeError:
+        pass
+    except Exception as e:
+        logger.warning("Audio worker stream %s failed: %s", id, e)
+    finally:
+        volumes.pop(id, None)
+
+        if pipe is not None:
+            pipe.close()
+        else:
+            os.close(fd)
+
+        if source is not None:
+            source.cleanup()
+
+
+def _serve(connection: Connection, parent: int):
+    """
+    Main loop of an audio worker process, starting a pipeline thread for every requested stream.
+
+    Args:
+        connection (Connection): Control connection with the main process.
+        parent (int): Pid of the main process, receiving the pipes.
+    """
+    if OPUS_LIBRARY_PATH and not opus.is_loaded():
+        opus.load_opus(OPUS_LIBRARY_PATH)
+
+    volumes: Dict[int, float] = {}
+
+    while True:
+        try:
+            message: Optional[Tuple] = connection.recv()
+        except EOFError:
+            return
+
+        if message is None:
+            return
+
+        if message[0] == "play":
+            _, id, target, volume, start = message
+            read, write = os.pipe()
+            send_handle(connection, read, parent)
+            os.close(read)
+            threading.Thread(target=_encode, args=(target, volume, start, write, volumes, id), daemon=True).start()
+        elif message[0] == "volume":
+            _, id, volume = message
+            volumes[id] = volume
+
+
+class AudioWorker:
+    """
+    Handle of an audio worker process, owning the FFmpeg pipelines and the Opus encoding of its streams.
+    """
+
+    process: multiprocessing.process.BaseProcess
+    connection: Connection
+    streams: int
+    lock: threading.Lock
+
+    def __init__(self):
+        connection, child = multiprocessing.Pipe()
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(target=_serve, args=(child, os.getpid()), name="audio-worker", daemon=True)
+        self.process.start()
+        child.close()
+        self.connection = connection
+        self.streams = 0
+        self.lock = threading.Lock()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def open(self, id: int, target: Target, volume: float, start: float = 0) -> IO[bytes]:
+        """
+        Start the pipeline of a stream and get the pipe its Opus packets are written into.
+
+        Args:
+            id (int): Id of the stream.
+            target (Target): Resolved stream, or path of a cached file.
+            volume (float): Initial volume.
+            start (float): Position in seconds the song starts from.
+
+        Returns:
+            IO[bytes]: Read end of the pipe.
+        """
+        with self.lock:
+            self.connection.send(("play", id, target, volume, start))
+            fd: int = recv_handle(self.connection)
+
+        return os.fdopen(fd, "rb")
+
+    def set_volume(self, id: int, volume: float):
+        with self.lock:
+            self.connection.send(("volume", id, volume))
+
+    def close(self):
+        try:
+            with self.lock:
+                self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+
+        self.connection.close()
+
+
+class WorkerSource(AudioSource):
+    """
+    Audio source forwarding the Opus packets produced by an audio worker process.
+    """
+
+    id: int
+    pool: "AudioWorkerPool"
+    worker: AudioWorker
+    pipe: IO[bytes]
+    decoded: bool
+    _volume: float
+
+    def __init__(
+        self, id: int, pool: "AudioWorkerPool", worker: AudioWorker, pipe: IO[bytes], volume: float, decoded: bool
+    ):
+        self.id = id
+        self.pool = pool
+        self.worker = worker
+        self.pipe = pipe
+        self.decoded = decoded
+        self._volume = volume
+
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+    @volume.setter
+    def volume(self, volume: float):
+        self._volume = volume
+        self.worker.set_volume(self.id, volume)
+
+    def read(self) -> bytes:
+        header: bytes = self.pipe.read(PACKET_HEADER_SIZE)
+
+        if len(header) < PACKET_HEADER_SIZE:
+            return b""
+
+        return self.pipe.read(int.from_bytes(header, "little"))
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self):
+        if not self.pipe.closed:
+            self.pipe.close()
+            self.pool.release(self.worker)
+
+
+class AudioWorkerPool:
+    """
+    Opt-in pool of processes running the FFmpeg pipelines and the Opus encoding of the songs,
+    so the bot process only forwards the packets to the voice connections.
+    The sources are opened from executor threads and closed from the voice threads, so the workers
+    and their stream counts are only changed with the lock held.
+    """
+
+    size: int
+    workers: List[AudioWorker]
+    ids: Any
+    lock: threading.Lock
+
+    def __init__(self, size: int = AUDIO_WORKERS):
+        self.size = size
+        self.workers = []
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        metrics.register(Gauge("audio_worker_streams", "Streams run by the audio workers.", [], self.get_streams))
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def get_streams(self) -> Dict[Labels, float]:
+        return {(): sum(worker.streams for worker in self.workers)}
+
+    def get_worker(self) -> AudioWorker:
+        """
+        Get the worker running the fewest streams, replacing the stopped workers. Called with the lock held.
+
+        Returns:
+            AudioWorker: The worker.
+        """
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
+
+        while len(self.workers) < self.size:
+            self.workers.append(AudioWorker())
+
+        return min(self.workers, key=lambda worker: worker.streams)
+
+    def acquire(self) -> AudioWorker:
+        """
+        Reserve a stream on the least busy worker.
+
+        Returns:
+            AudioWorker: The worker.
+        """
+        with self.lock:
+            worker: AudioWorker = self.get_worker()
+            worker.streams += 1
+            return worker
+
+    def release(self, worker: AudioWorker, stopped: bool = False):
+        """
+        Release a stream reserved on a worker.
+
+        Args:
+            worker (AudioWorker): The worker.
+            stopped (bool): The worker stopped responding and is removed from the pool.
+        """
+        with self.lock:
+            worker.streams -= 1
+
+            if stopped and worker in self.workers:
+                self.workers.remove(worker)
+
+    def open(self, target: Target, volume: float, start: float = 0) -> WorkerSource:
+        id: int = next(self.ids)
+        worker: AudioWorker = self.acquire()
+
+        try:
+            pipe: IO[bytes] = worker.open(id, target, volume, start)
+        except (EOFError, OSError):
+            worker.close()
+            worker.process.kill()
+            self.release(worker, stopped=True)
+            worker = self.acquire()
+
+            try:
+                pipe = worker.open(id, target, volume, start)
+            except BaseException:
+                self.release(worker)
+                raise
+
+        return WorkerSource(id, self, worker, pipe, volume, is_decoded(target))
+
+    async def create(self, target: Target, volume: float = DEFAULT_VOLUME, start: float = 0) -> WorkerSource:
+        """
+        Create a source playing a song through an audio worker. (asynchronous)
+        Starting a worker process is done in a thread, so the event loop is not blocked while it imports.
+
+        Args:
+            target (Target): Resolved stream, or path of a cached file.
+            volume (float): Volume of the source.
+            start (float): Position in seconds the song starts from.
+
+        Returns:
+            WorkerSource: The audio source.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.open, target, volume, start)
+
+    def shutdown(self):
+        with self.lock:
+            for worker in self.workers:
+                worker.close()
+
+            self.workers = []
+
+
+audio_workers: AudioWorkerPool = AudioWorkerPool()
@@ -0,0 +1,149 @@
+import asyncio
+import itertools
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set
+
+from discord_bot.utils.cache import LRUCache
+from discord_bot.utils.metrics import Counter, metrics
+from discord_bot.utils.search_index import normalize, search_index
+from discord_bot.utils.youtube import YoutubeSourceInfo
+
+AUTOCOMPLETE_DEBOUNCE: float = float(os.environ.get("AUTOCOMPLETE_DEBOUNCE", 0.3))
+AUTOCOMPLETE_TIMEOUT: float = float(os.environ.get("AUTOCOMPLETE_TIMEOUT", 2))
+AUTOCOMPLETE_CONCURRENCY: int = int(os.environ.get("AUTOCOMPLETE_CONCURRENCY", 2))
+AUTOCOMPLETE_CACHE_SIZE: int = 1024
+AUTOCOMPLETE_CACHE_TTL: float = 10 * 60
+AUTOCOMPLETE_MIN_LENGTH: int = 3
+AUTOCOMPLETE_RESULTS: int = 10
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+autocomplete_requests: Counter = metrics.register(
+    Counter("autocomplete_requests_total", "Autocomplete suggestions, by where they came from.", ["outcome"])
+)
+
+
+class Autocomplete:
+    """
+    Suggest tracks for a query being typed, within the deadline Discord gives to autocomplete interactions.
+
+    Suggestions are first looked up in a per-prefix cache, then in the search index of the tracks already resolved.
+    When the index does not have enough of them, a Youtube search runs once the user stopped typing for the debounce
+    delay. A search is shared by every user typing the same prefix and the number of searches running at once is
+    bounded, so that the suggestions never delay the extractions of the songs being queued. A search still running at
+    the deadline keeps going in the background and fills the cache and the index for the next keystrokes.
+    """
+
+    delay: float
+    timeout: float
+    concurrency: int
+    cache: LRUCache[str, List[Dict]]
+    lookups: Dict[str, asyncio.Task]
+    latest: Dict[int, int]
+    counter: Any
+
+    def __init__(
+        self,
+        delay: float = AUTOCOMPLETE_DEBOUNCE,
+        timeout: float = AUTOCOMPLETE_TIMEOUT,
+        concurrency: int = AUTOCOMPLETE_CONCURRENCY,
+    ):
+        self.delay = delay
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.cache = LRUCache(AUTOCOMPLETE_CACHE_SIZE, AUTOCOMPLETE_CACHE_TTL)
+        self.lookups = {}
+        self.latest = {}
+        self.counter = itertools.count()
+
+    async def suggest(self, user_id: int, query: str) -> List[YoutubeSourceInfo]:
+        """
+        Get the tracks suggested for a query being typed. (asynchronous)
+
+        Args:
+            user_id (int): Id of the user typing the query.
+            query (str): The query typed so far.
+
+        Returns:
+            List[YoutubeSourceInfo]: The suggested tracks, most relevant first.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        started: float = loop.time()
+        key: str = normalize(query)
+
+        if not key:
+            return []
+
+        cached: Optional[List[Dict]] = self.cache.get(key)
+
+        if cached is not None:
+            autocomplete_requests.inc("cache")
+            return [YoutubeSourceInfo(data=entry) for entry in cached]
+
+        local: List[YoutubeSourceInfo] = search_index.search(query, AUTOCOMPLETE_RESULTS, prefix=True)
+
+        if len(local) >= AUTOCOMPLETE_RESULTS or len(key) < AUTOCOMPLETE_MIN_LENGTH:
+            autocomplete_requests.inc("index")
+            return local
+
+        if key not in self.lookups:
+            token: int = next(self.counter)
+            self.latest[user_id] = token
+            await asyncio.sleep(self.delay)
+
+            if self.latest.get(user_id) != token:
+                autocomplete_requests.inc("debounced")
+                return local
+
+            del self.latest[user_id]
+
+        task: Optional[asyncio.Task] = self.lookups.get(key)
+
+        if task is None:
+            if len(self.lookups) >= self.concurrency:
+                autocomplete_requests.inc("busy")
+                return local
+
+            task = self.lookups[key] = loop.create_task(self.lookup(key, query, local))
+
+        try:
+            songs: List[YoutubeSourceInfo] = await asyncio.wait_for(
+                asyncio.shield(task), self.timeout - (loop.time() - started)
+            )
+        except asyncio.TimeoutError:
+            autocomplete_requests.inc("timeout")
+            return local
+
+        autocomplete_requests.inc("search")
+        return songs
+
+    async def lookup(self, key: str, query: str, local: List[YoutubeSourceInfo]) -> List[YoutubeSourceInfo]:
+        """
+        Search Youtube for a query and cache the suggestions of its prefix. (asynchronous)
+
+        Args:
+            key (str): Normalized query, key of the cache.
+            query (str): The query typed so far.
+            local (List[YoutubeSourceInfo]): Tracks of the search index matching the query, suggested first.
+
+        Returns:
+            List[YoutubeSourceInfo]: The suggested tracks.
+        """
+        try:
+            found: List[YoutubeSourceInfo] = await YoutubeSourceInfo.search(query, search=True)
+        except Exception as e:
+            logger.warning("Failed to search suggestions for %r: %s", query, e)
+            return local
+        finally:
+            del self.lookups[key]
+
+        search_index.add(found)
+
+        ids: Set[str] = {song.id for song in local}
+        songs: List[YoutubeSourceInfo] = (local + [song for song in found if song.id not in ids])[:AUTOCOMPLETE_RESULTS]
+        self.cache.set(key, [song.to_dict() for song in songs])
+        return songs
+
+
+autocomplete: Autocomplete = Autocomplete()
@@ -0,0 +1,356 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
+from urllib.parse import parse_qs, urlparse
+
+from discord_bot.utils.metrics import Counter, Gauge, Labels, metrics
+
+METADATA_CACHE_PATH: str = os.environ.get(
+    "METADATA_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "discord-bot", "metadata.sqlite3")
+)
+METADATA_CACHE_TTL: int = int(os.environ.get("METADATA_CACHE_TTL", 24 * 60 * 60))
+METADATA_CACHE_MEMORY_SIZE: int = int(os.environ.get("METADATA_CACHE_MEMORY_SIZE", 1024))
+METADATA_CACHE_DISK_SIZE: int = int(os.environ.get("METADATA_CACHE_DISK_SIZE", 100000))
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+metadata_cache_lookups: Counter = metrics.register(
+    Counter("metadata_cache_lookups_total", "Lookups of the metadata cache, by tier of the hit or miss.", ["result"])
+)
+metadata_cache_evictions: Counter = metrics.register(
+    Counter("metadata_cache_evictions_total", "Entries evicted from the metadata cache, by tier.", ["tier"])
+)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    In-memory least recently used cache with a time to live on each entry.
+    """
+
+    size: int
+    ttl: float
+    entries: "OrderedDict[K, Tuple[float, V]]"
+    evictions: int
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        Get an entry and mark it as recently used.
+
+        Args:
+            key (K): Key of the entry.
+
+        Returns:
+            Optional[V]: The value, None if missing or expired.
+        """
+        entry: Optional[Tuple[float, V]] = self.entries.get(key)
+
+        if entry is None:
+            return None
+
+        if entry[0] < time.time():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: K, value: V, expires: Optional[float] = None):
+        """
+        Store an entry, evicting the least recently used ones if the cache is full.
+
+        Args:
+            key (K): Key of the entry.
+            value (V): Value of the entry.
+            expires (Optional[float]): Expiration timestamp, defaults to now + ttl.
+        """
+        self.entries[key] = (expires if expires is not None else time.time() + self.ttl, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+
+class MetadataCache:
+    """
+    Two tier cache of the metadata returned by `YoutubeDL.extract_info`.
+
+    Entries are first looked up in an in-memory LRU, then in a SQLite database that survives restarts.
+    Queries are stored as a list of video ids, and every video is stored once by id.
+    The database is only accessed from a dedicated thread, so the disk tier never blocks the event loop.
+    """
+
+    path: str
+    ttl: int
+    disk_size: int
+    disk_entries: int
+    memory: LRUCache[str, List[Dict]]
+    _executor: Optional[ThreadPoolExecutor]
+    _connection: Optional[sqlite3.Connection]
+
+    def __init__(
+        self,
+        path: str = METADATA_CACHE_PATH,
+        ttl: int = METADATA_CACHE_TTL,
+        memory_size: int = METADATA_CACHE_MEMORY_SIZE,
+        disk_size: int = METADATA_CACHE_DISK_SIZE,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.disk_size = disk_size
+        self.disk_entries = 0
+        self.memory = LRUCache(memory_size, ttl)
+        self._executor = None
+        self._connection = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="metadata-cache")
+        return self._executor
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        Lazily open the SQLite database and create its tables, only from the cache thread.
+
+        Returns:
+            sqlite3.Connection: The database connection.
+        """
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            self._connection = sqlite3.connect(self.path)
+            self._connection.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS videos (id TEXT PRIMARY KEY, data TEXT, expires REAL, accessed REAL);
+                CREATE TABLE IF NOT EXISTS queries (query TEXT PRIMARY KEY, ids TEXT, expires REAL, accessed REAL);
+                CREATE INDEX IF NOT EXISTS videos_accessed ON videos (accessed);
+                CREATE INDEX IF NOT EXISTS queries_accessed ON queries (accessed);
+                """
+            )
+            self.disk_entries = self._connection.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        return self._connection
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+        Normalize a query so that equivalent queries and URLs share the same key.
+
+        Args:
+            query (str): The query or URL given to yt-dlp.
+
+        Returns:
+            str: The cache key of the query, `video:<id>` for URLs of a video even within a playlist,
+                as yt-dlp only extracts the video, and `playlist:<id>` for URLs of a playlist.
+        """
+        query = query.strip()
+        url = urlparse(query)
+
+        if url.scheme in ("http", "https") and url.netloc:
+            parameters: Dict[str, List[str]] = parse_qs(url.query)
+            host: str = url.netloc.lower().removeprefix("www.").removeprefix("m.")
+
+            if host == "youtu.be" and url.path.strip("/"):
+                return f"video:{url.path.strip('/')}"
+            if "v" in parameters:
+                return f"video:{parameters['v'][0]}"
+            if "list" in parameters:
+                return f"playlist:{parameters['list'][0]}"
+            return f"url:{host}{url.path.rstrip('/')}"
+
+        return "query:" + re.sub(r"\s+", " ", query.lower())
+
+    async def get(self, query: str) -> Optional[List[Dict]]:
+        """
+        Get the cached entries of a query. (asynchronous)
+
+        Args:
+            query (str): The query or URL given to yt-dlp.
+
+        Returns:
+            Optional[List[Dict]]: The cached entries, None on a miss.
+        """
+        key: str = self.normalize(query)
+        entries: Optional[List[Dict]] = self.memory.get(key)
+
+        if entries is not None:
+            metadata_cache_lookups.inc("memory")
+            return entries
+
+        loaded: Optional[Tuple[List[Dict], float]] = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._load, key
+        )
+
+        if loaded is None:
+            metadata_cache_lookups.inc("miss")
+            return None
+
+        metadata_cache_lookups.inc("disk")
+        self._remember(key, *loaded)
+        return loaded[0]
+
+    def set(self, query: str, entries: List[Dict]):
+        """
+        Store the entries returned for a query, in memory right away and on the disk in the background.
+
+        Args:
+            query (str): The query or URL given to yt-dlp.
+            entries (List[Dict]): The metadata of the found tracks.
+        """
+        key: str = self.normalize(query)
+        entries = [entry for entry in entries if entry.get("id")]
+
+        if not entries:
+            return
+
+        now: float = time.time()
+        expires: float = now + self.ttl
+
+        self._remember(key, entries, expires)
+        self.executor.submit(self._store, key, entries, now, expires)
+
+    def _remember(self, key: str, entries: List[Dict], expires: float):
+        evictions: int = self.memory.evictions
+        self.memory.set(key, entries, expires)
+        metadata_cache_evictions.inc("memory", value=self.memory.evictions - evictions)
+
+    def _store(self, key: str, entries: List[Dict], now: float, expires: float):
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?)",
+                    [(entry["id"], json.dumps(entry), expires, now) for entry in entries],
+                )
+                if not key.startswith("video:"):
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?)",
+                        (key, json.dumps([entry["id"] for entry in entries]), expires, now),
+                    )
+                self._evict(now)
+        except sqlite3.Error as e:
+            logger.warning("Failed to store the metadata of %s: %s", key, e)
+
+    def _load(self, key: str) -> Optional[Tuple[List[Dict], float]]:
+        """
+        Load the entries of a key from the disk.
+
+        Args:
+            key (str): Normalized key of the query.
+
+        Returns:
+            Optional[Tuple[List[Dict], float]]: The entries and their expiration, None if missing, expired or incomplete.
+        """
+        now: float = time.time()
+        ids: List[str]
+        expires: float
+
+        if key.startswith("video:"):
+            ids, expires = [key.removeprefix("video:")], now + self.ttl
+        else:
+            row: Any = self.connection.execute(
+                "SELECT ids, expires FROM queries WHERE query = ? AND expires > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            ids, expires = json.loads(row[0]), row[1]
+
+        rows: Dict[str, Tuple[str, float]] = {
+            row[0]: (row[1], row[2])
+            for row in self.connection.execute(
+                f"SELECT id, data, expires FROM videos WHERE id IN ({','.join('?' * len(ids))}) AND expires > ?",
+                (*ids, now),
+            )
+        }
+
+        if any(id not in rows for id in ids):
+            return None
+
+        with self.connection:
+            self.connection.execute(
+                f"UPDATE videos SET accessed = ? WHERE id IN ({','.join('?' * len(ids))})", (now, *ids)
+            )
+            self.connection.execute("UPDATE queries SET accessed = ? WHERE query = ?", (now, key))
+
+        entries: List[Dict] = [json.loads(rows[id][0]) for id in ids]
+        return entries, min(expires, *(expires for _, expires in rows.values()))
+
+    def _evict(self, now: float):
+        """
+        Remove expired entries and the least recently used ones above the disk size limit.
+
+        Args:
+            now (float): Current timestamp.
+        """
+        for table in ("videos", "queries"):
+            cursor: sqlite3.Cursor = self.connection.execute(f"DELETE FROM {table} WHERE expires <= ?", (now,))
+            metadata_cache_evictions.inc("disk", value=max(cursor.rowcount, 0))
+
+            cursor = self.connection.execute(
+                f"DELETE FROM {table} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.disk_size,),
+            )
+            metadata_cache_evictions.inc("disk", value=max(cursor.rowcount, 0))
+
+        self.disk_entries = self.connection.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def get_sizes(self) -> Dict[Labels, float]:
+        """
+        Get the number of entries of both tiers, collected by the metrics.
+
+        Returns:
+            Dict[Labels, float]: The number of queries in memory and of videos on the disk.
+        """
+        return {("memory",): len(self.memory), ("disk",): self.disk_entries}
+
+    def close(self):
+        """
+        Write the pending entries and close the database.
+        """
+        if self._executor is not None:
+            self._executor.submit(self._close)
+            self._executor.shutdown()
+            self._executor = None
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+metadata_cache: MetadataCache = MetadataCache()
+
+metrics.register(
+    Gauge(
+        "metadata_cache_entries",
+        "Queries in memory and videos on disk in the metadata cache.",
+        ["tier"],
+        metadata_cache.get_sizes,
+    )
+)
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import discord
+from discord import app_commands
+from discord.abc import Snowflake
+
+COMMAND_SYNC_PATH: str = os.environ.get(
+    "COMMAND_SYNC_PATH", os.path.join(os.path.expanduser("~"), ".cache", "discord-bot", "commands.json")
+)
+COMMAND_SYNC_GUILDS: bool = os.environ.get("COMMAND_SYNC_GUILDS", "0") == "1"
+COMMAND_SYNC_CONCURRENCY: int = int(os.environ.get("COMMAND_SYNC_CONCURRENCY", 4))
+COMMAND_SYNC_RATE: float = float(os.environ.get("COMMAND_SYNC_RATE", 2))
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def get_tree_hash(tree: app_commands.CommandTree, guild: Optional[Snowflake] = None) -> str:
+    """
+    Hash the commands of a tree, as they are sent to Discord.
+
+    Args:
+        tree (app_commands.CommandTree): The command tree.
+        guild (Optional[Snowflake]): Guild whose commands are hashed, the global commands when None.
+
+    Returns:
+        str: Hexadecimal SHA-256 of the commands.
+    """
+    payload: List[dict] = sorted(
+        (command.to_dict() for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command["type"], command["name"]),
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class RateLimiter:
+    """
+    Token bucket limiting the rate of some requests, allowing short bursts.
+    """
+
+    rate: float
+    capacity: float
+    tokens: float
+    updated: float
+    lock: asyncio.Lock
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Wait until a request is allowed. (asynchronous)
+        """
+        async with self.lock:
+            while True:
+                now: float = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CommandSync:
+    """
+    Synchronize the application commands with Discord only when they changed since the last startup.
+
+    The hash of the synced commands is stored locally, globally and by guild. By default the commands are
+    synced once globally, and the copies left in the guilds by a previous per guild sync are removed.
+    With `COMMAND_SYNC_GUILDS`, the commands are copied in every guild instead, which makes them available
+    instantly, and only the guilds whose hash changed are synced. Guild syncs run concurrently under a
+    rate limiter.
+    """
+
+    tree: app_commands.CommandTree
+    path: str
+    per_guild: bool
+    state: Dict
+    semaphore: asyncio.Semaphore
+    limiter: RateLimiter
+
+    def __init__(
+        self,
+        tree: app_commands.CommandTree,
+        path: str = COMMAND_SYNC_PATH,
+        per_guild: bool = COMMAND_SYNC_GUILDS,
+        concurrency: int = COMMAND_SYNC_CONCURRENCY,
+        rate: float = COMMAND_SYNC_RATE,
+    ):
+        self.tree = tree
+        self.path = path
+        self.per_guild = per_guild
+        self.state = self.load()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rate)
+
+    def load(self) -> Dict:
+        try:
+            with open(self.path) as file:
+                state: Dict = json.load(file)
+        except (OSError, ValueError):
+            return {"global": None, "guilds": {}}
+
+        return {"global": state.get("global"), "guilds": dict(state.get("guilds", {}))}
+
+    def save(self):
+        directory: str = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(f"{self.path}.tmp", "w") as file:
+            json.dump(self.state, file)
+
+        os.replace(f"{self.path}.tmp", self.path)
+
+    async def sync_global(self) -> bool:
+        """
+        Sync the global commands if they changed. (asynchronous)
+
+        Returns:
+            bool: True if the commands were sent to Discord.
+        """
+        digest: str = get_tree_hash(self.tree)
+
+        if digest == self.state["global"]:
+            return False
+
+        await self.limiter.acquire()
+        await self.tree.sync()
+        self.state["global"] = digest
+        return True
+
+    async def sync_guild(self, guild: Snowflake) -> bool:
+        """
+        Sync the commands of a guild if they changed. (asynchronous)
+
+        Args:
+            guild (Snowflake): The guild.
+
+        Returns:
+            bool: True if the commands were sent to Discord.
+        """
+        if self.per_guild:
+            self.tree.copy_global_to(guild=guild)
+        else:
+            self.tree.clear_commands(guild=guild)
+
+        digest: str = get_tree_hash(self.tree, guild)
+
+        if digest == self.state["guilds"].get(str(guild.id)):
+            return False
+
+        async with self.semaphore:
+            await self.limiter.acquire()
+            try:
+                await self.tree.sync(guild=guild)
+            except discord.HTTPException as e:
+                logger.warning("Failed to sync the commands of the guild %s: %s", guild.id, e)
+                return False
+
+        self.state["guilds"][str(guild.id)] = digest
+        return True
+
+    async def sync(self, guilds: List[Snowflake], sync_global: bool = True):
+        """
+        Sync the commands that changed since the last startup, and store their hashes. (asynchronous)
+
+        Args:
+            guilds (List[Snowflake]): Guilds handled by this process.
+            sync_global (bool): Whether this process syncs the global commands, only one process should.
+        """
+        started: float = time.perf_counter()
+        synced: int = 0
+
+        try:
+            if sync_global and not self.per_guild:
+                synced += await self.sync_global()
+
+            results: List[bool] = await asyncio.gather(*(self.sync_guild(guild) for guild in guilds))
+            synced += sum(results)
+        finally:
+            self.save()
+
+        logger.info(
+            "Synced the commands %s times for %s guilds in %.2fs", synced, len(guilds), time.perf_counter() - started
+        )
@@ -1,22 +1,26 @@
+from discord import Message
 from discord.errors import Forbidden
 from discord.ext.commands import Context
 
 
-async def send(context: Context, *args, **kwargs):
+async def send(context: Context, *args, **kwargs) -> Message:
     """Function to send a message safely.
 
     Args:
         context (Context): message context.
         embed (Embed): message embedding.
 
+    Returns:
+        Message: The message sent.
+
     Raises:
         discord.HTTPException
             Sending the message failed.
     """
     try:
-        await context.send(*args, **kwargs)
+        return await context.send(*args, **kwargs)
     except Forbidden:
-        await context.author.send(
+        return await context.author.send(
             f"Hey, seems like I can't send any message in {context.channel} on {context.guild}\n"
             "May you inform the server team about this issue? :slight_smile:",
             *args,
@@ -0,0 +1,201 @@
+import array
+import os
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from discord import AudioSource
+from discord.opus import Encoder
+
+from discord_bot.utils.audio_worker import WorkerSource
+from discord_bot.utils.metrics import audio_stalls, audio_underruns
+from discord_bot.utils.youtube import YoutubeSource
+
+try:
+    import fcntl
+    import termios
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+    termios = None  # type: ignore
+
+FRAME_STATS_WINDOW: int = int(os.environ.get("FRAME_STATS_WINDOW", 500))
+FRAME_DURATION: float = Encoder.FRAME_LENGTH / 1000
+PAUSE_THRESHOLD: float = 0.5
+JITTER_SMOOTHING: int = 16
+
+
+class FrameStats:
+    """
+    Rolling timing statistics of the frames read by the voice client.
+
+    The jitter is the smoothed deviation of the interval between two reads from 20 ms (RFC 3550 estimator),
+    a stall is a single read blocked for longer than a frame, and a deadline is missed when a frame
+    is returned more than a frame after the time it should have been sent at.
+    """
+
+    __slots__ = (
+        "frames",
+        "bytes",
+        "stalls",
+        "missed",
+        "jitter",
+        "max_read_time",
+        "read_times",
+        "_origin",
+        "_index",
+        "_last_start",
+        "_last_end",
+    )
+
+    frames: int
+    bytes: int
+    stalls: int
+    missed: int
+    jitter: float
+    max_read_time: float
+    read_times: Deque[float]
+    _origin: float
+    _index: int
+    _last_start: float
+    _last_end: float
+
+    def __init__(self, window: int = FRAME_STATS_WINDOW):
+        self.frames = 0
+        self.bytes = 0
+        self.stalls = 0
+        self.missed = 0
+        self.jitter = 0
+        self.max_read_time = 0
+        self.read_times = deque(maxlen=window)
+        self._origin = 0
+        self._index = 0
+        self._last_start = 0
+        self._last_end = 0
+
+    def record(self, start: float, end: float, size: int):
+        """
+        Record the timing of a frame read.
+
+        Args:
+            start (float): Time the read started at.
+            end (float): Time the read returned at.
+            size (int): Size of the frame in bytes.
+        """
+        read_time: float = end - start
+
+        # The first frame, or the first one after a pause, starts a new schedule: its read time includes
+        # the start of FFmpeg and is not held against the deadlines.
+        if not self.frames or start - self._last_end > PAUSE_THRESHOLD:
+            self._origin, self._index = end, 0
+        else:
+            self.jitter += (abs(start - self._last_start - FRAME_DURATION) - self.jitter) / JITTER_SMOOTHING
+            self._index += 1
+
+            if end > self._origin + (self._index + 1) * FRAME_DURATION:
+                self.missed += 1
+                self._origin, self._index = end, 0
+                audio_underruns.inc()
+
+            if read_time > FRAME_DURATION:
+                self.stalls += 1
+                audio_stalls.inc()
+
+        self.frames += 1
+        self.bytes += size
+        self.max_read_time = max(self.max_read_time, read_time)
+        self.read_times.append(read_time)
+        self._last_start, self._last_end = start, end
+
+    def get_read_time(self, percentile: float) -> float:
+        """
+        Get a percentile of the read time over the rolling window.
+
+        Args:
+            percentile (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The read time in seconds.
+        """
+        read_times = sorted(self.read_times)
+
+        if not read_times:
+            return 0
+
+        return read_times[min(len(read_times) - 1, int(len(read_times) * percentile / 100))]
+
+    def merge(self, other: "FrameStats"):
+        """
+        Add the counters of the statistics of a track to the ones of a session.
+
+        Args:
+            other (FrameStats): Statistics of the track.
+        """
+        self.frames += other.frames
+        self.bytes += other.bytes
+        self.stalls += other.stalls
+        self.missed += other.missed
+        self.max_read_time = max(self.max_read_time, other.max_read_time)
+        self.read_times.extend(other.read_times)
+
+        if self.frames:
+            self.jitter += (other.jitter - self.jitter) * other.frames / self.frames
+
+
+class MonitoredSource(AudioSource):
+    """
+    Audio source measuring the timing of every frame read from the source it wraps.
+    """
+
+    original: AudioSource
+    stats: FrameStats
+    session: Optional[FrameStats]
+
+    def __init__(self, original: AudioSource, session: Optional[FrameStats] = None):
+        self.original = original
+        self.stats = FrameStats()
+        self.session = session
+
+    def read(self) -> bytes:
+        start: float = time.perf_counter()
+        data: bytes = self.original.read()
+
+        if data:
+            self.stats.record(start, time.perf_counter(), len(data))
+
+        return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.original.cleanup()
+
+        if self.session is not None:
+            self.session.merge(self.stats)
+            self.session = None
+
+    def get_buffered(self) -> int:
+        """
+        Get the number of bytes decoded by FFmpeg but not read by the voice client yet.
+
+        Returns:
+            int: Bytes held by the batch of the source and the FFmpeg or audio worker pipe.
+        """
+        source: AudioSource = self.original
+        buffered: int = 0
+
+        if isinstance(source, YoutubeSource):
+            buffered += source.buffered
+            source = source.original
+
+        stdout = source.pipe if isinstance(source, WorkerSource) else getattr(source, "_stdout", None)
+
+        if fcntl is not None and stdout is not None:
+            size = array.array("i", [0])
+            try:
+                fcntl.ioctl(stdout.fileno(), termios.FIONREAD, size)
+                buffered += size[0]
+            except (OSError, ValueError):
+                pass
+
+        return buffered
@@ -0,0 +1,301 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from discord_bot.utils.metrics import extraction_duration
+
+if TYPE_CHECKING:
+    from yt_dlp import YoutubeDL
+
+EXTRACTOR_WORKERS: int = int(os.environ.get("EXTRACTOR_WORKERS", 4))
+EXTRACTOR_PROCESSES: bool = os.environ.get("EXTRACTOR_PROCESSES", "0") == "1"
+EXTRACTOR_MAX_IN_FLIGHT: int = int(os.environ.get("EXTRACTOR_MAX_IN_FLIGHT", 8))
+EXTRACTOR_BATCH_SIZE: int = int(os.environ.get("EXTRACTOR_BATCH_SIZE", 50))
+EXTRACTOR_MAX_REDIRECTS: int = 3
+
+_worker = threading.local()
+
+
+def _get_youtube(profile: str, options: Dict) -> "YoutubeDL":
+    """
+    Get the `YoutubeDL` instance owned by the current worker for an options set.
+    yt-dlp is only imported by the workers, it is slow to import and not needed before the first extraction.
+
+    Args:
+        profile (str): Name of the options set.
+        options (Dict): yt-dlp options, `match_filter` being given as a filter string.
+
+    Returns:
+        YoutubeDL: The worker instance.
+    """
+    if not hasattr(_worker, "youtubes"):
+        _worker.youtubes = {}
+
+    youtube: Optional["YoutubeDL"] = _worker.youtubes.get(profile)
+
+    if youtube is None:
+        from yt_dlp import YoutubeDL, utils
+
+        if isinstance(options.get("match_filter"), str):
+            options = {**options, "match_filter": utils.match_filter_func(options["match_filter"])}
+        youtube = _worker.youtubes[profile] = YoutubeDL(options)
+
+    return youtube
+
+
+def _extract(profile: str, options: Dict, query: str, sanitize: bool, download: bool = False) -> Any:
+    """
+    Run `extract_info` with the `YoutubeDL` instance owned by the current worker.
+
+    Args:
+        profile (str): Name of the options set, used to reuse the worker instance.
+        options (Dict): yt-dlp options, `match_filter` being given as a filter string.
+        query (str): The query or URL to extract.
+        sanitize (bool): Make the result picklable to send it back from a worker process.
+        download (bool): Also download the media.
+
+    Returns:
+        Any: The extracted information.
+    """
+    youtube: "YoutubeDL" = _get_youtube(profile, options)
+    data: Any = youtube.extract_info(query, download=download)
+    return youtube.sanitize_info(data) if sanitize and data is not None else data
+
+
+def _warm_up(profiles: Dict[str, Dict]):
+    """
+    Create the `YoutubeDL` instances of the current worker.
+
+    Args:
+        profiles (Dict[str, Dict]): yt-dlp options, by name of options set.
+    """
+    for profile, options in profiles.items():
+        _get_youtube(profile, options)
+
+
+def _stream(
+    profile: str,
+    options: Dict,
+    query: str,
+    batch_size: int,
+    push: Callable[[List[Dict]], None],
+    stop: threading.Event,
+):
+    """
+    Extract the entries of a query without processing them, pushing them by batches as soon as
+    the playlist pages are fetched. The first batch only holds one entry so it can be played right away.
+    Results redirecting to another URL, such as a video of a playlist under `noplaylist`, are resolved,
+    and entries without a title are skipped.
+
+    Args:
+        profile (str): Name of the options set, used to reuse the worker instance.
+        options (Dict): yt-dlp options, `match_filter` being given as a filter string.
+        query (str): The query or URL to extract.
+        batch_size (int): Number of entries per batch.
+        push (Callable[[List[Dict]], None]): Thread safe callback receiving the batches.
+        stop (threading.Event): Event set when the consumer is not interested anymore.
+    """
+    youtube: "YoutubeDL" = _get_youtube(profile, options)
+    data: Any = youtube.extract_info(query, download=False, process=False)
+
+    for _ in range(EXTRACTOR_MAX_REDIRECTS):
+        if data is None or data.get("_type") != "url":
+            break
+        data = youtube.extract_info(data["url"], download=False, process=False, ie_key=data.get("ie_key"))
+
+    if data is None:
+        return
+
+    if "entries" not in data:
+        if data.get("title"):
+            push([data])
+        return
+
+    match_filter: Optional[Callable] = youtube.params.get("match_filter")
+    batch: List[Dict] = []
+    size: int = 1
+
+    for entry in data["entries"]:
+        if stop.is_set():
+            return
+
+        if not entry or not entry.get("title"):
+            continue
+
+        if match_filter is not None and match_filter(entry, incomplete=True) is not None:
+            continue
+
+        batch.append(entry)
+
+        if len(batch) >= size:
+            push(batch)
+            batch, size = [], batch_size
+
+    if batch:
+        push(batch)
+
+
+class Extractor:
+    """
+    Dedicated pool running yt-dlp extractions.
+
+    Every worker owns its `YoutubeDL` instances, the number of extractions in flight is bounded
+    and identical concurrent extractions share a single result.
+    """
+
+    workers: int
+    processes: bool
+    max_in_flight: int
+    in_flight: Dict[Tuple[str, str], asyncio.Future]
+    _executor: Optional[Executor]
+    _semaphore: Optional[asyncio.Semaphore]
+
+    def __init__(
+        self,
+        workers: int = EXTRACTOR_WORKERS,
+        processes: bool = EXTRACTOR_PROCESSES,
+        max_in_flight: int = EXTRACTOR_MAX_IN_FLIGHT,
+    ):
+        self.workers = workers
+        self.processes = processes
+        self.max_in_flight = max_in_flight
+        self.in_flight = {}
+        self._executor = None
+        self._semaphore = None
+
+    @property
+    def executor(self) -> Executor:
+        """
+        Lazily start the worker pool.
+
+        Returns:
+            Executor: The worker pool.
+        """
+        if self._executor is None:
+            if self.processes:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="extractor")
+        return self._executor
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def extract(self, profile: str, options: Dict, query: str, download: bool = False) -> Any:
+        """
+        Extract the information of a query, joining an identical extraction already in flight.
+        (asynchronous)
+
+        Args:
+            profile (str): Name of the options set.
+            options (Dict): yt-dlp options.
+            query (str): The query or URL to extract.
+            download (bool): Also download the media.
+
+        Returns:
+            Any: The extracted information.
+        """
+        key: Tuple[str, str] = (profile, query)
+        future: Optional[asyncio.Future] = self.in_flight.get(key)
+
+        if future is None:
+            future = self.in_flight[key] = asyncio.ensure_future(self._run(profile, options, query, download))
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+        return await asyncio.shield(future)
+
+    async def stream(
+        self, profile: str, options: Dict, query: str, batch_size: int = EXTRACTOR_BATCH_SIZE
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Extract the entries of a query by batches, without waiting for the whole playlist.
+        The in flight slot is only held by the worker, and released as soon as the extraction ends,
+        however long the consumer takes to handle the batches.
+        Worker processes cannot stream their results back, in that case the entries are
+        extracted at once and then split in batches.
+        (asynchronous)
+
+        Args:
+            profile (str): Name of the options set.
+            options (Dict): yt-dlp options.
+            query (str): The query or URL to extract.
+            batch_size (int): Number of entries per batch.
+
+        Yields:
+            List[Dict]: The batches of unprocessed entries.
+        """
+        if self.processes:
+            data: Any = await self.extract(profile, options, query)
+            entries: List[Dict] = [] if data is None else data.get("entries", [data])
+            entries = [entry for entry in entries if entry and entry.get("title")]
+            for i in range(0, len(entries), batch_size):
+                yield entries[i : i + batch_size]
+            return
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        batches: asyncio.Queue = asyncio.Queue()
+        stop: threading.Event = threading.Event()
+
+        await self.semaphore.acquire()
+        start: float = time.perf_counter()
+
+        def done(_):
+            self.semaphore.release()
+            extraction_duration.observe(profile, value=time.perf_counter() - start)
+            batches.put_nowait(None)
+
+        try:
+            future: asyncio.Future = loop.run_in_executor(
+                self.executor,
+                _stream,
+                profile,
+                options,
+                query,
+                batch_size,
+                lambda batch: loop.call_soon_threadsafe(batches.put_nowait, batch),
+                stop,
+            )
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+        future.add_done_callback(done)
+
+        try:
+            while (batch := await batches.get()) is not None:
+                yield batch
+            await future
+        finally:
+            stop.set()
+
+    async def warm_up(self, profiles: Dict[str, Dict]):
+        """
+        Start the workers and create their `YoutubeDL` instances ahead of the first extraction. (asynchronous)
+
+        Args:
+            profiles (Dict[str, Dict]): yt-dlp options, by name of options set.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up, profiles) for _ in range(self.workers)))
+
+    async def _run(self, profile: str, options: Dict, query: str, download: bool) -> Any:
+        async with self.semaphore:
+            with extraction_duration.time(profile):
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.executor, _extract, profile, options, query, self.processes, download
+                )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+extractor: Extractor = Extractor()
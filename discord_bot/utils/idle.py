@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+
+
+class IdleScheduler(Generic[K]):
+    """
+    Call a function once a key stayed idle for a timeout.
+
+    The deadlines are kept in a heap watched by a single task, sleeping until the nearest one.
+    Disarmed deadlines are left in the heap and skipped once popped, so arming a key costs O(log n)
+    and disarming it O(1), whatever the number of keys.
+    """
+
+    timeout: float
+    callback: Callable[[K], Awaitable[Any]]
+    deadlines: Dict[K, float]
+    heap: List[Tuple[float, int, K]]
+    counter: Any
+    _wake: Optional[asyncio.Event]
+    _task: Optional[asyncio.Task]
+
+    def __init__(self, timeout: float, callback: Callable[[K], Awaitable[Any]]):
+        self.timeout = timeout
+        self.callback = callback
+        self.deadlines = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self._wake = None
+        self._task = None
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.deadlines
+
+    def arm(self, key: K):
+        """
+        Start the idle timer of a key, if it is not already running.
+
+        Args:
+            key (K): The key.
+        """
+        if key in self.deadlines:
+            return
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        deadline: float = loop.time() + self.timeout
+        self.deadlines[key] = deadline
+        heapq.heappush(self.heap, (deadline, next(self.counter), key))
+
+        if len(self.heap) > 2 * len(self.deadlines) + 64:
+            self.compact()
+
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self.run())
+        elif self.heap[0][0] == deadline and self._wake is not None:
+            self._wake.set()
+
+    def disarm(self, key: K):
+        """
+        Stop the idle timer of a key.
+
+        Args:
+            key (K): The key.
+        """
+        self.deadlines.pop(key, None)
+
+    def compact(self):
+        """
+        Drop the disarmed deadlines from the heap.
+        """
+        self.heap = [entry for entry in self.heap if self.deadlines.get(entry[2]) == entry[0]]
+        heapq.heapify(self.heap)
+
+    async def run(self):
+        """
+        Sleep until the nearest deadline and call the function of the expired keys. (asynchronous)
+        """
+        assert self._wake is not None
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        while True:
+            self._wake.clear()
+            now: float = loop.time()
+
+            while self.heap and (self.heap[0][0] <= now or self.deadlines.get(self.heap[0][2]) != self.heap[0][0]):
+                deadline, _, key = heapq.heappop(self.heap)
+
+                if self.deadlines.get(key) == deadline:
+                    del self.deadlines[key]
+                    loop.create_task(self.expire(key))
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.heap[0][0] - now if self.heap else None)
+            except asyncio.TimeoutError:
+                pass
+
+    async def expire(self, key: K):
+        try:
+            await self.callback(key)
+        except Exception:
+            logger.exception("Idle callback failed for %s", key)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self.deadlines.clear()
+        self.heap.clear()
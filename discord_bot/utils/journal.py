@@ -0,0 +1,421 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Set, Tuple, cast
+
+from discord import Guild, Member
+from discord.abc import Messageable
+from discord.ext.commands import Context
+
+if TYPE_CHECKING:
+    from discord_bot.utils.player import Player
+    from discord_bot.utils.queue import QueueEntry
+
+QUEUE_JOURNAL_PATH: str = os.environ.get(
+    "QUEUE_JOURNAL_PATH", os.path.join(os.path.expanduser("~"), ".cache", "discord-bot", "queues.sqlite3")
+)
+QUEUE_JOURNAL_INTERVAL: float = float(os.environ.get("QUEUE_JOURNAL_INTERVAL", 1))
+QUEUE_SNAPSHOT_THRESHOLD: int = int(os.environ.get("QUEUE_SNAPSHOT_THRESHOLD", 500))
+QUEUE_RESUME: bool = os.environ.get("QUEUE_RESUME", "1") == "1"
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+Record = Dict[str, Any]
+
+
+def get_record(entry: "QueueEntry") -> Record:
+    """
+    Get the persisted form of a queue entry.
+
+    Args:
+        entry (QueueEntry): The entry.
+
+    Returns:
+        Record: The id, metadata and requester of the song, and the channel it was requested in.
+    """
+    return {
+        "id": entry.id,
+        "song": entry.song.to_dict(),
+        "requester": entry.song.requester_id,
+        "channel": (
+            entry.context.channel_id if isinstance(entry.context, RestoredContext) else entry.context.channel.id
+        ),
+    }
+
+
+def replay(records: List[Record], op: str, data: Any) -> List[Record]:
+    """
+    Apply a journaled mutation to the records of a queue.
+
+    Args:
+        records (List[Record]): Records of the queue, in play order.
+        op (str): Name of the `MusicQueue` mutation.
+        data (Any): Arguments of the mutation.
+
+    Returns:
+        List[Record]: The updated records.
+    """
+    if op == "append":
+        records.append(data)
+    elif op == "insert":
+        records.insert(0, data)
+    elif op == "pop":
+        del records[:1]
+    elif op == "remove":
+        records = [record for record in records if record["id"] != data[0]]
+    elif op == "move":
+        moved: List[Record] = [record for record in records if record["id"] == data[0]]
+        records = [record for record in records if record["id"] != data[0]]
+        records[data[1] : data[1]] = moved
+    elif op == "shuffle":
+        positions: Dict[int, int] = {id: position for position, id in enumerate(data[0])}
+        records.sort(key=lambda record: positions.get(record["id"], len(positions)))
+    elif op == "clear":
+        records = []
+
+    return records
+
+
+class RestoredContext:
+    """
+    Stand-in for the context of a command issued before a restart, so the restored songs
+    are announced in the channel where they were requested.
+    The id of the channel is kept even when it is not found anymore, so the songs can still be journaled.
+    """
+
+    guild: Guild
+    channel: Optional[Messageable]
+    channel_id: Optional[int]
+    author: Member
+    interaction: None = None
+    command: None = None
+
+    def __init__(self, guild: Guild, channel: Optional[Messageable], channel_id: Optional[int], author: Member):
+        self.guild = guild
+        self.channel = channel
+        self.channel_id = channel_id
+        self.author = author
+
+    @classmethod
+    def create(cls, guild: Guild, record: Record) -> Context:
+        """
+        Create the context of a restored song.
+
+        Args:
+            guild (Guild): Guild of the queue.
+            record (Record): Persisted entry of the song.
+
+        Returns:
+            Context: The context, the bot standing as requester if the member left.
+        """
+        channel: Any = guild.get_channel(record["channel"]) or next(
+            (channel for channel in guild.text_channels if channel.permissions_for(guild.me).send_messages), None
+        )
+        author: Member = guild.get_member(record["requester"] or 0) or guild.me
+        return cast(Context, cls(guild, channel, channel.id if channel is not None else record["channel"], author))
+
+    async def send(self, *args, **kwargs):
+        if self.channel is not None:
+            return await self.channel.send(*args, **kwargs)
+
+
+class GuildState(NamedTuple):
+    entries: List[Record]
+    session: Optional[Dict]
+
+
+class QueueJournal:
+    """
+    Persist the queues and the voice sessions of the guilds, so they can be restored after a restart.
+
+    Every queue mutation is appended to a journal, written by batches in a SQLite database from a dedicated thread.
+    Once a guild has enough journaled mutations, or its queue is cleared, they are compacted into a snapshot
+    of the queue, so restoring a queue replays its snapshot and at most a few hundred mutations.
+    The voice channel, volume, current song and position of the connected players are saved with every batch.
+    """
+
+    path: str
+    interval: float
+    threshold: int
+    players: Dict[int, "Player"]
+    pending: List[Tuple[int, str, Any]]
+    counts: Dict[int, int]
+    compactions: Set[int]
+    sessions: Dict[int, Optional[Dict]]
+    ended: Set[int]
+    closed: bool
+    _executor: Optional[ThreadPoolExecutor]
+    _connection: Optional[sqlite3.Connection]
+    _task: Optional[asyncio.Task]
+
+    def __init__(
+        self,
+        path: str = QUEUE_JOURNAL_PATH,
+        interval: float = QUEUE_JOURNAL_INTERVAL,
+        threshold: int = QUEUE_SNAPSHOT_THRESHOLD,
+    ):
+        self.path = path
+        self.interval = interval
+        self.threshold = threshold
+        self.players = {}
+        self.pending = []
+        self.counts = {}
+        self.compactions = set()
+        self.sessions = {}
+        self.ended = set()
+        self.closed = False
+        self._executor = None
+        self._connection = None
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and not self.closed
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="queue-journal")
+        return self._executor
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        Lazily open the SQLite database and create its tables, only from the journal thread.
+
+        Returns:
+            sqlite3.Connection: The database connection.
+        """
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS journal (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT, guild_id INTEGER, op TEXT, data TEXT
+                );
+                CREATE INDEX IF NOT EXISTS journal_guild ON journal (guild_id, seq);
+                CREATE TABLE IF NOT EXISTS snapshots (guild_id INTEGER PRIMARY KEY, seq INTEGER, entries TEXT);
+                CREATE TABLE IF NOT EXISTS sessions (guild_id INTEGER PRIMARY KEY, data TEXT);
+                """
+            )
+        return self._connection
+
+    def track(self, player: "Player"):
+        """
+        Journal the mutations of the queue of a player, and save its voice session.
+
+        Args:
+            player (Player): The player.
+        """
+        if not self.enabled:
+            return
+
+        self.players[player.guild_id] = player
+        player.queue.listener = partial(self.record, player.guild_id)
+
+    def untrack(self, guild_id: int):
+        """
+        Stop journaling a player whose voice session ended, and forget its session.
+
+        Args:
+            guild_id (int): Id of the guild.
+        """
+        player: Optional["Player"] = self.players.pop(guild_id, None)
+
+        if player is not None:
+            player.queue.listener = None
+
+        if self.enabled:
+            self.ended.add(guild_id)
+            self.start()
+
+    def record(self, guild_id: int, op: str, *args):
+        """
+        Journal a queue mutation.
+
+        Args:
+            guild_id (int): Id of the guild.
+            op (str): Name of the mutation.
+            args: Arguments of the mutation, the entry for the `append` and `insert` mutations.
+        """
+        if not self.enabled:
+            return
+
+        data: Any = get_record(args[0]) if op in ("append", "insert") else list(args)
+        self.pending.append((guild_id, op, data))
+        self.counts[guild_id] = self.counts.get(guild_id, 0) + 1
+
+        if op == "clear" or self.counts[guild_id] >= self.threshold:
+            self.compactions.add(guild_id)
+
+        self.start()
+
+    def compact(self, guild_id: int):
+        """
+        Replace the journal of a guild by a snapshot of its queue on the next write.
+
+        Args:
+            guild_id (int): Id of the guild, its saved queue is dropped if it has no player.
+        """
+        if self.enabled:
+            self.compactions.add(guild_id)
+            self.start()
+
+    def get_session(self, player: "Player") -> Optional[Dict]:
+        if player.voice_client is None or not player.voice_client.is_connected():
+            return None
+
+        return {
+            "channel": player.voice_client.channel.id,
+            "volume": player.volume,
+            "current": get_record(player.current) if player.current is not None else None,
+            "position": round(player.get_position(), 1),
+        }
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        """
+        Write the journal by batches at a fixed interval. (asynchronous)
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to write the queue journal")
+
+    async def flush(self):
+        """
+        Write the pending mutations, snapshots and voice sessions. (asynchronous)
+        The snapshots are taken now, so they include exactly the pending mutations.
+        """
+        records, self.pending = self.pending, []
+        snapshots: Dict[int, List[Record]] = {}
+
+        for guild_id in self.compactions:
+            player: Optional["Player"] = self.players.get(guild_id)
+            snapshots[guild_id] = [get_record(entry) for entry in player.queue] if player is not None else []
+            self.counts.pop(guild_id, None)
+
+        self.compactions.clear()
+
+        sessions: Dict[int, Optional[Dict]] = {guild_id: None for guild_id in self.ended}
+        sessions.update({guild_id: self.get_session(player) for guild_id, player in self.players.items()})
+        sessions = {
+            guild_id: session for guild_id, session in sessions.items() if self.sessions.get(guild_id) != session
+        }
+        self.ended.clear()
+
+        if not records and not snapshots and not sessions:
+            return
+
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._write, records, snapshots, sessions)
+
+        for guild_id, session in sessions.items():
+            if session is None:
+                self.sessions.pop(guild_id, None)
+            else:
+                self.sessions[guild_id] = session
+
+    def _write(self, records: List[Tuple[int, str, Any]], snapshots: Dict[int, List[Record]], sessions: Dict[int, Any]):
+        with self.connection as connection:
+            connection.executemany(
+                "INSERT INTO journal (guild_id, op, data) VALUES (?, ?, ?)",
+                [(guild_id, op, json.dumps(data)) for guild_id, op, data in records],
+            )
+
+            for guild_id, entries in snapshots.items():
+                if entries:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO snapshots (guild_id, seq, entries) "
+                        "VALUES (?, (SELECT COALESCE(MAX(seq), 0) FROM journal WHERE guild_id = ?), ?)",
+                        (guild_id, guild_id, json.dumps(entries)),
+                    )
+                else:
+                    connection.execute("DELETE FROM snapshots WHERE guild_id = ?", (guild_id,))
+
+                connection.execute("DELETE FROM journal WHERE guild_id = ?", (guild_id,))
+
+            for guild_id, session in sessions.items():
+                if session is None:
+                    connection.execute("DELETE FROM sessions WHERE guild_id = ?", (guild_id,))
+                else:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO sessions (guild_id, data) VALUES (?, ?)",
+                        (guild_id, json.dumps(session)),
+                    )
+
+    async def load(self) -> Dict[int, GuildState]:
+        """
+        Load the queues and voice sessions saved before the restart. (asynchronous)
+
+        Returns:
+            Dict[int, GuildState]: The queue records and voice session of each guild.
+        """
+        if not self.enabled:
+            return {}
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._read)
+
+    def _read(self) -> Dict[int, GuildState]:
+        queues: Dict[int, List[Record]] = {
+            guild_id: json.loads(entries)
+            for guild_id, entries in self.connection.execute("SELECT guild_id, entries FROM snapshots")
+        }
+
+        for guild_id, op, data in self.connection.execute(
+            "SELECT guild_id, op, data FROM journal j "
+            "WHERE seq > COALESCE((SELECT seq FROM snapshots s WHERE s.guild_id = j.guild_id), 0) ORDER BY seq"
+        ):
+            queues[guild_id] = replay(queues.get(guild_id, []), op, json.loads(data))
+
+        sessions: Dict[int, Dict] = {
+            guild_id: json.loads(data)
+            for guild_id, data in self.connection.execute("SELECT guild_id, data FROM sessions")
+        }
+        self.sessions.update(sessions)
+
+        return {
+            guild_id: GuildState(queues.get(guild_id, []), sessions.get(guild_id))
+            for guild_id in queues.keys() | sessions.keys()
+        }
+
+    async def close(self):
+        """
+        Write the pending mutations and stop journaling, the queues are then kept as they are
+        while the bot disconnects. (asynchronous)
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self.enabled:
+            await self.flush()
+
+        self.closed = True
+
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+            self._executor.shutdown()
+            self._executor = None
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+queue_journal: QueueJournal = QueueJournal()
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from discord_bot.utils.metrics import Counter, Gauge, Histogram, Labels, metrics
+
+LOOP_LAG_INTERVAL: float = float(os.environ.get("LOOP_LAG_INTERVAL", 0.1))
+LOOP_LAG_THRESHOLD: float = float(os.environ.get("LOOP_LAG_THRESHOLD", 0.25))
+LOOP_LAG_WINDOW: int = 600
+LOOP_LAG_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """
+    Measure the scheduling delay of the event loop and report the code blocking it.
+
+    A task sleeps for a fixed interval and records how late it is woken up. A watchdog thread checks that
+    the task keeps running, and when the loop stays blocked for longer than the threshold it logs the stack
+    of the loop thread, which is the code of the offending coroutine.
+    """
+
+    interval: float
+    threshold: float
+    lags: Deque[float]
+    lag: Histogram
+    blocked: Counter
+    _heartbeat: float
+    _reported: float
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _thread_id: Optional[int]
+    _task: Optional[asyncio.Task]
+    _watchdog: Optional[threading.Thread]
+    _stop: threading.Event
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = LOOP_LAG_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = deque(maxlen=LOOP_LAG_WINDOW)
+        self._heartbeat = 0
+        self._reported = 0
+        self._loop = None
+        self._thread_id = None
+        self._task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+
+        self.lag = metrics.register(
+            Histogram("event_loop_lag_seconds", "Delay of the event loop callbacks.", buckets=LOOP_LAG_BUCKETS)
+        )
+        self.blocked = metrics.register(
+            Counter("event_loop_blocked_total", "Times the event loop was blocked for longer than the threshold.")
+        )
+        metrics.register(Gauge("event_loop_lag_p99_seconds", "p99 of the recent event loop lag.", [], self.get_p99))
+
+    def get_lag(self, percentile: float) -> float:
+        """
+        Get a percentile of the recent lag of the event loop.
+
+        Args:
+            percentile (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The lag in seconds.
+        """
+        lags = sorted(self.lags)
+
+        if not lags:
+            return 0
+
+        return lags[min(len(lags) - 1, int(len(lags) * percentile / 100))]
+
+    def get_p99(self) -> Dict[Labels, float]:
+        return {(): self.get_lag(99)}
+
+    async def start(self):
+        """
+        Start sampling the lag of the running event loop and watching it from another thread. (asynchronous)
+        """
+        if self._task is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stop.clear()
+        self._task = self._loop.create_task(self.sample())
+        self._watchdog = threading.Thread(target=self.watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def sample(self):
+        """
+        Sleep for the sampling interval in loop and record how late each wake up is. (asynchronous)
+        """
+        while True:
+            start: float = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.perf_counter()
+
+            lag: float = max(0, self._heartbeat - start - self.interval)
+            self.lags.append(lag)
+            self.lag.observe(value=lag)
+
+    def watch(self):
+        """
+        Log the stack of the event loop thread once per blocking period longer than the threshold.
+        """
+        while not self._stop.wait(self.interval):
+            heartbeat: float = self._heartbeat
+            blocked: float = time.perf_counter() - heartbeat - self.interval
+
+            if blocked < self.threshold or heartbeat == self._reported or self._thread_id is None:
+                continue
+
+            self._reported = heartbeat
+            self.blocked.inc()
+
+            frame = sys._current_frames().get(self._thread_id)
+            task: Optional[asyncio.Task] = asyncio.current_task(self._loop) if self._loop is not None else None
+            stack: str = "".join(traceback.format_stack(frame)) if frame is not None else "unavailable\n"
+            logger.warning(
+                "Event loop blocked for %.0f ms in task %s:\n%s",
+                blocked * 1000,
+                task.get_name() if task is not None else "<callback>",
+                stack,
+            )
+
+    async def stop(self):
+        """
+        Stop sampling and watching the event loop. (asynchronous)
+        """
+        self._stop.set()
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self._watchdog = None
+
+
+loop_monitor: LoopMonitor = LoopMonitor()
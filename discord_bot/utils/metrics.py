@@ -0,0 +1,290 @@
+import bisect
+import logging
+import math
+import os
+import time
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from aiohttp import web
+
+METRICS_HOST: str = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT: int = int(os.environ.get("METRICS_PORT", 9108))
+METRICS_PREFIX: str = "discord_bot_"
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+Labels = Tuple[str, ...]
+MetricType = TypeVar("MetricType", bound="Metric")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs: List[str] = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    Base of the metrics, holding one value per set of label values.
+    """
+
+    type: str = "untyped"
+
+    name: str
+    documentation: str
+    labels: Tuple[str, ...]
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = METRICS_PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        """
+        Iterate over the samples of the metric.
+
+        Yields:
+            Tuple[str, Labels, str, float]: Suffix of the name, label values, extra label and value.
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines: List[str] = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(self.labels, values, extra)} {format_value(value)}")
+
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count.
+    """
+
+    type = "counter"
+
+    values: Dict[Labels, float]
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values = {} if labels else {(): 0}
+
+    def inc(self, *labels: str, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        for labels, value in self.values.items():
+            yield "", labels, "", value
+
+
+class Gauge(Metric):
+    """
+    Value going up and down. The value can also be computed when the metrics are collected,
+    keeping the instrumented code untouched.
+    """
+
+    type = "gauge"
+
+    values: Dict[Labels, float]
+    function: Optional[Callable[[], Dict[Labels, float]]]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        function: Optional[Callable[[], Dict[Labels, float]]] = None,
+    ):
+        super().__init__(name, documentation, labels)
+        self.values = {}
+        self.function = function
+
+    def set(self, *labels: str, value: float):
+        self.values[labels] = value
+
+    def inc(self, *labels: str, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def dec(self, *labels: str, value: float = 1):
+        self.inc(*labels, value=-value)
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        if self.function is not None:
+            self.values = self.function()
+
+        for labels, value in self.values.items():
+            yield "", labels, "", value
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values in cumulative buckets.
+    """
+
+    type = "histogram"
+
+    buckets: Tuple[float, ...]
+    counts: Dict[Labels, List[int]]
+    sums: Dict[Labels, float]
+
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.counts = {}
+        self.sums = {}
+
+    def observe(self, *labels: str, value: float):
+        counts: Optional[List[int]] = self.counts.get(labels)
+
+        if counts is None:
+            counts = self.counts[labels] = [0] * len(self.buckets)
+            self.sums[labels] = 0
+
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def time(self, *labels: str) -> "Timer":
+        return Timer(self, labels)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        for labels, counts in list(self.counts.items()):
+            total: int = 0
+            for bucket, count in zip(self.buckets, counts):
+                total += count
+                yield "_bucket", labels, f'le="{format_value(bucket)}"', total
+            yield "_sum", labels, "", self.sums[labels]
+            yield "_count", labels, "", total
+
+
+class Timer:
+    """
+    Context manager and decorator observing the time spent in a block into a histogram.
+    """
+
+    __slots__ = ("histogram", "labels", "start")
+
+    histogram: Histogram
+    labels: Labels
+    start: float
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.histogram.observe(*self.labels, value=time.perf_counter() - self.start)
+
+    def __call__(self, function: Callable) -> Callable:
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            start: float = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                self.histogram.observe(*self.labels, value=time.perf_counter() - start)
+
+        return wrapper
+
+
+class MetricsRegistry:
+    """
+    Collection of the metrics of the bot, served in the Prometheus text format on `/metrics`.
+    """
+
+    metrics: Dict[str, Metric]
+    host: str
+    port: int
+    _runner: Optional[web.AppRunner]
+
+    def __init__(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.metrics = {}
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    def register(self, metric: MetricType) -> MetricType:
+        """
+        Register a metric, replacing the one already registered under the same name if any.
+
+        Args:
+            metric (MetricType): The metric.
+
+        Returns:
+            MetricType: The registered metric.
+        """
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        """
+        Serve the metrics on the local HTTP endpoint, unless the port is 0. (asynchronous)
+        """
+        if not self.port or self._runner is not None:
+            return
+
+        app: web.Application = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            logger.warning("Failed to serve the metrics on %s:%s: %s", self.host, self.port, e)
+            await self.stop()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+metrics: MetricsRegistry = MetricsRegistry()
+
+command_duration: Histogram = metrics.register(
+    Histogram("command_duration_seconds", "Time from the invocation of a command to its response.", ["command"])
+)
+extraction_duration: Histogram = metrics.register(
+    Histogram("extraction_duration_seconds", "Time spent extracting information with yt-dlp.", ["profile"])
+)
+prepare_duration: Histogram = metrics.register(
+    Histogram("prepare_duration_seconds", "Time spent preparing the audio source of a song.", ["origin"])
+)
+playback_errors: Counter = metrics.register(
+    Counter("playback_errors_total", "Songs that could not be played or stopped on an error.", ["reason"])
+)
+audio_underruns: Counter = metrics.register(
+    Counter("audio_underruns_total", "Audio frames read after the time they should have been sent at.")
+)
+audio_stalls: Counter = metrics.register(
+    Counter("audio_stalls_total", "Audio frame reads blocked on FFmpeg for longer than a frame.")
+)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from discord import HTTPException, Message, NotFound
+from discord.abc import Messageable
+
+from discord_bot.utils.metrics import Counter, metrics
+
+PANEL_DEBOUNCE: float = float(os.environ.get("PANEL_DEBOUNCE", 1))
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+panel_updates: Counter = metrics.register(
+    Counter("panel_updates_total", "Updates of the now playing panels, by outcome.", ["outcome"])
+)
+
+
+class Panel:
+    """
+    Message of a channel edited in place to show the latest state of a player.
+
+    Updates are coalesced: the first one is sent right away, the following ones are delayed until the debounce
+    window since the previous request has passed, and only the latest state is then sent. A single request is
+    in flight per panel, so when discord.py waits for the rate limit bucket of the channel, the updates keep
+    being merged instead of queuing behind it.
+    """
+
+    channel: Messageable
+    delay: float
+    message: Optional[Message]
+    pending: Optional[Dict[str, Any]]
+    updated: float
+    _task: Optional[asyncio.Task]
+
+    def __init__(self, channel: Messageable, delay: float = PANEL_DEBOUNCE):
+        self.channel = channel
+        self.delay = delay
+        self.message = None
+        self.pending = None
+        self.updated = 0
+        self._task = None
+
+    def update(self, **kwargs):
+        """
+        Show a new state in the panel, sending it if it was not sent yet.
+
+        Args:
+            kwargs: Content of the message, as given to `Message.edit`.
+        """
+        if self.pending is not None:
+            panel_updates.inc("coalesced")
+
+        self.pending = kwargs
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        """
+        Send the latest pending state once the debounce window passed, until no state is pending. (asynchronous)
+        """
+        while self.pending is not None:
+            wait: float = self.updated + self.delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            kwargs, self.pending = self.pending, None
+
+            try:
+                if self.message is not None:
+                    try:
+                        await self.message.edit(**kwargs)
+                    except NotFound:
+                        self.message = None
+
+                if self.message is None:
+                    self.message = await self.channel.send(**kwargs)
+
+                panel_updates.inc("sent")
+            except HTTPException as e:
+                logger.warning("Failed to update the panel of the channel %s: %s", getattr(self.channel, "id", None), e)
+            finally:
+                self.updated = time.monotonic()
+
+    def close(self):
+        """
+        Stop updating the panel, the message is left as it is.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self.pending = None
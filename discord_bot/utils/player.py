@@ -0,0 +1,130 @@
+from typing import Any, Dict, Optional, Tuple
+
+from discord import VoiceClient
+
+from discord_bot.utils.diagnostics import FRAME_DURATION, FrameStats, MonitoredSource
+from discord_bot.utils.journal import queue_journal
+from discord_bot.utils.panel import Panel
+from discord_bot.utils.prefetch import Prefetcher
+from discord_bot.utils.queue import MusicQueue, QueueEntry
+from discord_bot.utils.youtube import DEFAULT_VOLUME
+
+
+class Player:
+    """
+    Music state of a single guild: queue, voice client, now playing song
+    and frame timing statistics of the voice session.
+    """
+
+    guild_id: int
+    queue: MusicQueue
+    voice_client: Optional[VoiceClient]
+    volume: float
+    current: Optional[QueueEntry]
+    panel: Optional[Panel]
+    seek: float
+    offset: float
+    prefetcher: Prefetcher
+    pages: Dict[int, Tuple[str, str]]
+    pages_version: int
+    stats: FrameStats
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.queue = MusicQueue()
+        self.voice_client = None
+        self.volume = DEFAULT_VOLUME
+        self.current = None
+        self.panel = None
+        self.seek = 0
+        self.offset = 0
+        self.prefetcher = Prefetcher()
+        self.pages = {}
+        self.pages_version = -1
+        self.stats = FrameStats()
+
+    def is_connected(self) -> bool:
+        """
+        Check if the player owns a connected voice client.
+
+        Returns:
+            bool: True if the voice client is connected.
+        """
+        return self.voice_client is not None and self.voice_client.is_connected()
+
+    def get_position(self) -> float:
+        """
+        Get the position of the current song, from the number of frames played since it started.
+
+        Returns:
+            float: The position in seconds.
+        """
+        source: Any = self.voice_client.source if self.voice_client is not None else None
+        frames: int = source.stats.frames if isinstance(source, MonitoredSource) else 0
+        return self.offset + frames * FRAME_DURATION
+
+    def prefetch(self):
+        """
+        Resolve in the background the stream URLs of the next songs in the queue.
+        """
+        self.prefetcher.schedule([entry.song for entry in self.queue.slice(0, self.prefetcher.depth)])
+
+    def close(self):
+        """
+        Release every resource held by the player.
+        """
+        self.prefetcher.clear()
+        if self.panel is not None:
+            self.panel.close()
+        self.panel = None
+        self.voice_client = None
+        self.current = None
+        self.queue.clear()
+
+
+class PlayerRegistry:
+    """
+    Lazily create and tear down the player of each guild.
+    """
+
+    players: Dict[int, Player]
+
+    def __init__(self):
+        self.players = {}
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self.players
+
+    def get(self, guild_id: int) -> Player:
+        """
+        Get the player of a guild, creating it if needed.
+
+        Args:
+            guild_id (int): Id of the guild.
+
+        Returns:
+            Player: The guild player.
+        """
+        player: Optional[Player] = self.players.get(guild_id)
+
+        if player is None:
+            player = self.players[guild_id] = Player(guild_id)
+            queue_journal.track(player)
+
+        return player
+
+    def remove(self, guild_id: int):
+        """
+        Close and forget the player of a guild.
+
+        Args:
+            guild_id (int): Id of the guild.
+        """
+        player: Optional[Player] = self.players.pop(guild_id, None)
+
+        if player is not None:
+            player.close()
+            queue_journal.untrack(guild_id)
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from discord import AudioSource
+
+from discord_bot.main import client
+from discord_bot.utils.audio_cache import audio_cache
+from discord_bot.utils.audio_worker import audio_workers
+from discord_bot.utils.metrics import prepare_duration
+from discord_bot.utils.youtube import DEFAULT_VOLUME, Stream, YoutubeSource, YoutubeSourceInfo
+
+PREFETCH_DEPTH: int = int(os.environ.get("PREFETCH_DEPTH", 2))
+STREAM_URL_DEFAULT_TTL: int = 60 * 60
+STREAM_URL_MARGIN: int = 60
+
+
+def get_expiration(stream_url: str) -> float:
+    """
+    Get the expiration timestamp of a signed googlevideo stream URL.
+
+    Args:
+        stream_url (str): URL of the audio stream.
+
+    Returns:
+        float: The `expire` parameter of the URL, or a conservative default when missing.
+    """
+    expire: List[str] = parse_qs(urlparse(stream_url).query).get("expire", [])
+
+    if expire and expire[0].isdigit():
+        return float(expire[0])
+
+    return time.time() + STREAM_URL_DEFAULT_TTL
+
+
+class Prefetcher:
+    """
+    Resolve in the background the stream URLs of the next songs of a queue.
+    """
+
+    depth: int
+    streams: Dict[str, Tuple[Stream, float]]
+    tasks: Dict[str, asyncio.Task]
+
+    def __init__(self, depth: int = PREFETCH_DEPTH):
+        self.depth = depth
+        self.streams = {}
+        self.tasks = {}
+
+    def is_fresh(self, song: YoutubeSourceInfo) -> bool:
+        """
+        Check if the stream URL of a song is resolved and will stay valid for the whole song.
+
+        Args:
+            song (YoutubeSourceInfo): The song.
+
+        Returns:
+            bool: True if the resolved stream URL can be used.
+        """
+        stream: Optional[Tuple[Stream, float]] = self.streams.get(song.url)
+        return stream is not None and stream[1] > time.time() + (song.duration or 0) + STREAM_URL_MARGIN
+
+    def schedule(self, songs: List[YoutubeSourceInfo]):
+        """
+        Start resolving the stream URLs of the first songs, forget the ones not upcoming anymore.
+
+        Args:
+            songs (List[YoutubeSourceInfo]): Upcoming songs, in play order.
+        """
+        upcoming: List[YoutubeSourceInfo] = songs[: self.depth]
+        urls = {song.url for song in upcoming}
+
+        for url in [url for url in self.streams if url not in urls]:
+            del self.streams[url]
+
+        for url, task in list(self.tasks.items()):
+            if task.done() or url not in urls:
+                task.cancel()
+                del self.tasks[url]
+
+        for song in upcoming:
+            if song.url not in self.tasks and not self.is_fresh(song) and audio_cache.get(song) is None:
+                self.tasks[song.url] = client.loop.create_task(self.resolve(song.url))
+
+    async def resolve(self, url: str) -> Optional[Stream]:
+        """
+        Resolve and remember the audio stream of a song. (asynchronous)
+
+        Args:
+            url (str): URL of the video.
+
+        Returns:
+            Optional[Stream]: The audio stream, None if it could not be resolved.
+        """
+        stream: Optional[Stream] = await YoutubeSource.resolve(url)
+
+        if stream:
+            self.streams[url] = (stream, get_expiration(stream.url))
+
+        return stream
+
+    async def prepare(
+        self, song: YoutubeSourceInfo, volume: float = DEFAULT_VOLUME, start: float = 0
+    ) -> Optional[AudioSource]:
+        """
+        Get a ready audio source for a song, reading it from the audio cache when possible,
+        or else using the prefetched stream URL when it is still valid.
+        (asynchronous)
+
+        Args:
+            song (YoutubeSourceInfo): The song to play.
+            volume (float): Volume of the source.
+            start (float): Position in seconds the song starts from.
+
+        Returns:
+            Optional[AudioSource]: The audio source, None if the stream could not be resolved.
+        """
+        started: float = time.perf_counter()
+        task: Optional[asyncio.Task] = self.tasks.pop(song.url, None)
+        path: Optional[str] = audio_cache.get(song, play=True)
+
+        if path is not None:
+            if task is not None:
+                task.cancel()
+            source: AudioSource = (
+                await audio_workers.create(path, volume, start)
+                if audio_workers.enabled
+                else YoutubeSource.from_file(path, volume, start)
+            )
+            prepare_duration.observe("cache", value=time.perf_counter() - started)
+            return source
+
+        origin: str = "prefetch"
+
+        if not self.is_fresh(song):
+            if task is not None:
+                await asyncio.wait([task])
+            if not self.is_fresh(song):
+                origin = "resolve"
+                await self.resolve(song.url)
+
+        stream: Optional[Tuple[Stream, float]] = self.streams.pop(song.url, None)
+
+        if stream is None:
+            return None
+
+        source = (
+            await audio_workers.create(stream[0], volume, start)
+            if audio_workers.enabled
+            else YoutubeSource.from_stream(stream[0], volume, start)
+        )
+        prepare_duration.observe(origin, value=time.perf_counter() - started)
+        return source
+
+    def clear(self):
+        """
+        Cancel every pending resolution and forget the resolved stream URLs.
+        """
+        for task in self.tasks.values():
+            task.cancel()
+
+        self.tasks.clear()
+        self.streams.clear()
@@ -0,0 +1,237 @@
+import itertools
+import random
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from discord.ext.commands import Context
+
+from discord_bot.utils.youtube import YoutubeSourceInfo
+
+
+class QueueEntry(NamedTuple):
+    id: int
+    song: YoutubeSourceInfo
+    context: Context
+
+
+class MusicQueue:
+    """
+    Queue of songs with O(1) head pops, stable entry ids and a running total duration.
+
+    Positions are stored as absolute keys shifted by an offset, so popping or inserting
+    at the head does not require updating the index of the other entries.
+    The version is incremented on every mutation so renderings of the queue can be cached,
+    and the listener is called with the name and arguments of every mutation so they can be journaled.
+    """
+
+    entries: Deque[QueueEntry]
+    duration: int
+    version: int
+    listener: Optional[Callable[..., None]]
+    _index: Dict[int, int]
+    _offset: int
+    _ids: Iterator[int]
+
+    def __init__(self):
+        self.entries = deque()
+        self.duration = 0
+        self.version = 0
+        self.listener = None
+        self._index = {}
+        self._offset = 0
+        self._ids = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __bool__(self) -> bool:
+        return bool(self.entries)
+
+    def __iter__(self) -> Iterator[QueueEntry]:
+        return iter(self.entries)
+
+    def __contains__(self, id: int) -> bool:
+        return id in self._index
+
+    def slice(self, start: int, stop: int) -> List[QueueEntry]:
+        """
+        Get the entries between two positions.
+
+        Args:
+            start (int): First position, included.
+            stop (int): Last position, excluded.
+
+        Returns:
+            List[QueueEntry]: The entries.
+        """
+        return list(itertools.islice(self.entries, start, stop))
+
+    def songs(self) -> List[YoutubeSourceInfo]:
+        return [entry.song for entry in self.entries]
+
+    def position(self, id: int) -> Optional[int]:
+        """
+        Get the position of an entry.
+
+        Args:
+            id (int): Id of the entry.
+
+        Returns:
+            Optional[int]: The position, None if the entry is not queued.
+        """
+        key: Optional[int] = self._index.get(id)
+        return None if key is None else key - self._offset
+
+    def append(self, song: YoutubeSourceInfo, context: Context) -> QueueEntry:
+        """
+        Add a song at the end of the queue.
+
+        Args:
+            song (YoutubeSourceInfo): The song.
+            context (Context): Context of the command that requested the song.
+
+        Returns:
+            QueueEntry: The new entry.
+        """
+        song.requester_id = context.author.id
+        entry: QueueEntry = QueueEntry(next(self._ids), song, context)
+        self._index[entry.id] = self._offset + len(self.entries)
+        self.entries.append(entry)
+        self.duration += song.duration or 0
+        self.version += 1
+
+        if self.listener is not None:
+            self.listener("append", entry)
+
+        return entry
+
+    def extend(self, songs: Iterable[YoutubeSourceInfo], context: Context) -> List[QueueEntry]:
+        return [self.append(song, context) for song in songs]
+
+    def insert_next(self, song: YoutubeSourceInfo, context: Context) -> QueueEntry:
+        """
+        Add a song at the head of the queue, so it is the next one played.
+
+        Args:
+            song (YoutubeSourceInfo): The song.
+            context (Context): Context of the command that requested the song.
+
+        Returns:
+            QueueEntry: The new entry.
+        """
+        song.requester_id = context.author.id
+        entry: QueueEntry = QueueEntry(next(self._ids), song, context)
+        self._offset -= 1
+        self._index[entry.id] = self._offset
+        self.entries.appendleft(entry)
+        self.duration += song.duration or 0
+        self.version += 1
+
+        if self.listener is not None:
+            self.listener("insert", entry)
+
+        return entry
+
+    def popleft(self) -> QueueEntry:
+        """
+        Remove and return the head of the queue.
+
+        Raises:
+            IndexError: The queue is empty.
+
+        Returns:
+            QueueEntry: The head entry.
+        """
+        entry: QueueEntry = self.entries.popleft()
+        del self._index[entry.id]
+        self._offset += 1
+        self.duration -= entry.song.duration or 0
+        self.version += 1
+
+        if self.listener is not None:
+            self.listener("pop")
+
+        return entry
+
+    def remove(self, id: int) -> Optional[QueueEntry]:
+        """
+        Remove an entry from the queue.
+
+        Args:
+            id (int): Id of the entry.
+
+        Returns:
+            Optional[QueueEntry]: The removed entry, None if it was not queued.
+        """
+        position: Optional[int] = self.position(id)
+
+        if position is None:
+            return None
+
+        entry: QueueEntry = self.entries[position]
+        del self.entries[position]
+        del self._index[id]
+        self.duration -= entry.song.duration or 0
+        self.version += 1
+        self._reindex(position)
+
+        if self.listener is not None:
+            self.listener("remove", id)
+
+        return entry
+
+    def move(self, id: int, position: int):
+        """
+        Move an entry to another position.
+
+        Args:
+            id (int): Id of the entry.
+            position (int): New position of the entry, clamped to the queue bounds.
+
+        Raises:
+            KeyError: The entry is not queued.
+        """
+        current: Optional[int] = self.position(id)
+
+        if current is None:
+            raise KeyError(id)
+
+        position = max(0, min(position, len(self.entries) - 1))
+        entry: QueueEntry = self.entries[current]
+        del self.entries[current]
+        self.entries.insert(position, entry)
+        self.version += 1
+        self._reindex(min(current, position))
+
+        if self.listener is not None:
+            self.listener("move", id, position)
+
+    def shuffle(self):
+        entries: List[QueueEntry] = list(self.entries)
+        random.shuffle(entries)
+        self.entries = deque(entries)
+        self.version += 1
+        self._reindex(0)
+
+        if self.listener is not None:
+            self.listener("shuffle", [entry.id for entry in self.entries])
+
+    def clear(self):
+        self.entries.clear()
+        self._index.clear()
+        self._offset = 0
+        self.duration = 0
+        self.version += 1
+
+        if self.listener is not None:
+            self.listener("clear")
+
+    def _reindex(self, start: int):
+        """
+        Update the index of the entries after a position.
+
+        Args:
+            start (int): First position to update.
+        """
+        for position, entry in enumerate(itertools.islice(self.entries, start, None), start):
+            self._index[entry.id] = self._offset + position
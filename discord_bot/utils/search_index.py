@@ -0,0 +1,345 @@
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from discord_bot.utils.youtube import YoutubeSourceInfo
+
+SEARCH_INDEX_PATH: str = os.environ.get(
+    "SEARCH_INDEX_PATH", os.path.join(os.path.expanduser("~"), ".cache", "discord-bot", "search.sqlite3")
+)
+SEARCH_INDEX_SIZE: int = int(os.environ.get("SEARCH_INDEX_SIZE", 50000))
+SEARCH_MIN_SIMILARITY: float = 0.5
+SEARCH_PLAY_WEIGHT: float = 0.25
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize a text so that case, accents and punctuation do not matter when matching it.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        str: The lowercase words of the text without accents, separated by single spaces.
+    """
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+    return re.sub(r"[\W_]+", " ", text.casefold()).strip()
+
+
+def get_trigrams(text: str, prefix: bool = False) -> Set[str]:
+    """
+    Get the trigrams of the words of a text, padded so that short words and word starts also match.
+
+    Args:
+        text (str): The text.
+        prefix (bool): The last word may be incomplete, as in a query being typed, so its end is not padded.
+
+    Returns:
+        Set[str]: The trigrams.
+    """
+    words: List[str] = normalize(text).split()
+    trigrams: Set[str] = set()
+
+    for i, word in enumerate(words):
+        padded: str = f"  {word}" if prefix and i == len(words) - 1 else f"  {word} "
+        trigrams.update(padded[j : j + 3] for j in range(len(padded) - 2))
+
+    return trigrams
+
+
+def _select(plays: Dict[str, int], seen: Dict[str, float], count: int) -> List[Tuple[str, float]]:
+    """
+    Select the least played and least recently seen tracks.
+
+    Args:
+        plays (Dict[str, int]): Number of plays, by id of track.
+        seen (Dict[str, float]): Timestamp the tracks were last resolved or played at, by id of track.
+        count (int): Number of tracks.
+
+    Returns:
+        List[Tuple[str, float]]: The ids of the tracks, with the timestamp they were last seen at.
+    """
+    return [(id, seen[id]) for id in heapq.nsmallest(count, plays, key=lambda id: (plays[id], seen[id]))]
+
+
+class SearchIndex:
+    """
+    In-memory trigram index of the titles of the tracks the bot resolved, persisted in a SQLite database.
+
+    Each trigram maps to the ids of the tracks whose title contains it, so a query only counts the
+    trigrams it shares with the tracks sharing at least one, without scanning the whole index.
+    The tracks matching enough trigrams of the query are ranked by similarity, boosted by their play count.
+    The database is only accessed from a dedicated thread, which also selects the tracks to evict,
+    so the index is updated in memory without blocking the event loop.
+    """
+
+    path: str
+    size: int
+    tracks: Dict[str, Dict]
+    plays: Dict[str, int]
+    seen: Dict[str, float]
+    postings: Dict[str, Set[str]]
+    _loaded: bool
+    _evicting: bool
+    _executor: Optional[ThreadPoolExecutor]
+    _connection: Optional[sqlite3.Connection]
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH, size: int = SEARCH_INDEX_SIZE):
+        self.path = path
+        self.size = size
+        self.tracks = {}
+        self.plays = {}
+        self.seen = {}
+        self.postings = {}
+        self._loaded = False
+        self._evicting = False
+        self._executor = None
+        self._connection = None
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="search-index")
+        return self._executor
+
+    @property
+    def connection(self) -> Optional[sqlite3.Connection]:
+        """
+        Lazily open the SQLite database and create its table, only from the index thread.
+
+        Returns:
+            Optional[sqlite3.Connection]: The database connection, None when the persistence is disabled.
+        """
+        if self._connection is None and self.path:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            self._connection = sqlite3.connect(self.path)
+            self._connection.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS tracks (id TEXT PRIMARY KEY, data TEXT, plays INTEGER, seen REAL);
+                """
+            )
+        return self._connection
+
+    async def load(self):
+        """
+        Index the tracks saved before the restart. (asynchronous)
+
+        The index is built in the index thread, then the tracks added meanwhile are merged into it.
+        """
+        if self._loaded:
+            return
+
+        self._loaded = True
+
+        if not self.path:
+            return
+
+        loaded: SearchIndex = SearchIndex(path="", size=self.size)
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._read, loaded)
+
+        for id, data in self.tracks.items():
+            loaded._index(id, data, max(self.plays[id], loaded.plays.get(id, 0)), self.seen[id])
+
+        self.tracks, self.plays, self.seen, self.postings = loaded.tracks, loaded.plays, loaded.seen, loaded.postings
+
+    def _read(self, index: "SearchIndex"):
+        for id, data, plays, seen in self.connection.execute("SELECT id, data, plays, seen FROM tracks"):
+            index._index(id, json.loads(data), plays, seen)
+
+    def _index(self, id: str, data: Dict, plays: int, seen: float):
+        """
+        Add or replace a track in memory.
+
+        Args:
+            id (str): Id of the track.
+            data (Dict): Metadata of the track.
+            plays (int): Number of plays of the track.
+            seen (float): Timestamp the track was last resolved or played at.
+        """
+        previous: Optional[Dict] = self.tracks.get(id)
+
+        if previous is None or previous["title"] != data["title"]:
+            if previous is not None:
+                self._unindex(id)
+            for trigram in get_trigrams(data["title"]):
+                self.postings.setdefault(trigram, set()).add(id)
+
+        self.tracks[id] = data
+        self.plays[id] = plays
+        self.seen[id] = seen
+
+    def _unindex(self, id: str):
+        """
+        Remove a track from the trigram postings.
+
+        Args:
+            id (str): Id of the track.
+        """
+        for trigram in get_trigrams(self.tracks[id]["title"]):
+            ids: Optional[Set[str]] = self.postings.get(trigram)
+            if ids is not None:
+                ids.discard(id)
+                if not ids:
+                    del self.postings[trigram]
+
+    def add(self, songs: Iterable[YoutubeSourceInfo], played: bool = False):
+        """
+        Index resolved tracks, updating their metadata if they are already indexed.
+        The tracks are saved on the disk in the background.
+
+        Args:
+            songs (Iterable[YoutubeSourceInfo]): The tracks.
+            played (bool): Count a play of each track.
+        """
+        now: float = time.time()
+        rows: List[Any] = []
+
+        for song in songs:
+            if not song.id or not song.title:
+                continue
+
+            plays: int = self.plays.get(song.id, 0) + int(played)
+            data: Dict = song.to_dict()
+            self._index(song.id, data, plays, now)
+            rows.append((song.id, json.dumps(data), int(played), now))
+
+        if not rows:
+            return
+
+        if self.path:
+            self.executor.submit(self._write, rows)
+
+        self._evict()
+
+    def _write(self, rows: List[Any]):
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO tracks VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE "
+                    "SET data = excluded.data, plays = plays + excluded.plays, seen = excluded.seen",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to save %s tracks in the search index: %s", len(rows), e)
+
+    def _delete(self, ids: List[str]):
+        try:
+            with self.connection:
+                self.connection.executemany("DELETE FROM tracks WHERE id = ?", [(id,) for id in ids])
+        except sqlite3.Error as e:
+            logger.warning("Failed to remove %s tracks from the search index: %s", len(ids), e)
+
+    def record_play(self, song: YoutubeSourceInfo):
+        """
+        Count a play of a track, ranking it higher in the search results.
+
+        Args:
+            song (YoutubeSourceInfo): The track played.
+        """
+        self.add([song], played=True)
+
+    def _evict(self):
+        """
+        Remove the least played and least recently seen tracks once the index exceeds its size,
+        a tenth of the size at once so the eviction does not run on every addition.
+        The tracks are selected in the index thread from a copy of the play counts, then removed by the event loop.
+        """
+        if len(self.tracks) <= self.size or self._evicting:
+            return
+
+        self._evicting = True
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        count: int = len(self.tracks) - self.size + self.size // 10
+        future: Future = self.executor.submit(_select, dict(self.plays), dict(self.seen), count)
+        future.add_done_callback(lambda future: loop.call_soon_threadsafe(self._remove, future))
+
+    def _remove(self, future: Future):
+        """
+        Remove the tracks selected for eviction, except the ones resolved or played since they were selected.
+
+        Args:
+            future (Future): The selection of the index thread.
+        """
+        self._evicting = False
+
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        evicted: List[str] = [id for id, seen in future.result() if self.seen.get(id) == seen]
+
+        for id in evicted:
+            self._unindex(id)
+            del self.tracks[id]
+            del self.plays[id]
+            del self.seen[id]
+
+        if evicted and self.path and self._executor is not None:
+            self._executor.submit(self._delete, evicted)
+
+    def search(self, query: str, limit: int = 10, prefix: bool = False) -> List[YoutubeSourceInfo]:
+        """
+        Find the indexed tracks whose title is similar to a query.
+
+        Args:
+            query (str): The query.
+            limit (int): Maximum number of tracks returned.
+            prefix (bool): The last word of the query may be incomplete.
+
+        Returns:
+            List[YoutubeSourceInfo]: The best matching tracks, most relevant first.
+        """
+        trigrams: Set[str] = get_trigrams(query, prefix)
+
+        if not trigrams:
+            return []
+
+        counts: Counter = Counter()
+        for trigram in trigrams:
+            counts.update(self.postings.get(trigram, ()))
+
+        minimum: float = SEARCH_MIN_SIMILARITY * len(trigrams)
+        scores: Dict[str, float] = {
+            id: count / len(trigrams) * (1 + SEARCH_PLAY_WEIGHT * math.log1p(self.plays[id]))
+            for id, count in counts.items()
+            if count >= minimum
+        }
+        best: List[str] = heapq.nsmallest(limit, scores, key=lambda id: (-scores[id], -self.plays[id]))
+        return [YoutubeSourceInfo(data=self.tracks[id]) for id in best]
+
+    def close(self):
+        """
+        Write the pending tracks and close the database.
+        """
+        if self._executor is not None:
+            self._executor.submit(self._close)
+            self._executor.shutdown()
+            self._executor = None
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+search_index: SearchIndex = SearchIndex()
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional
+
+from discord.http import HTTPClient
+
+SHARD_RESTART_DELAY: float = float(os.environ.get("SHARD_RESTART_DELAY", 5))
+SHARD_STOP_TIMEOUT: float = float(os.environ.get("SHARD_STOP_TIMEOUT", 30))
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def parse_shard_ids(text: str) -> List[int]:
+    """
+    Parse a list of shard ids such as `0-3,8,10-11`.
+
+    Args:
+        text (str): Comma separated shard ids or inclusive ranges of shard ids.
+
+    Returns:
+        List[int]: The sorted shard ids.
+    """
+    shard_ids: set = set()
+
+    for part in text.split(","):
+        start, _, end = part.strip().partition("-")
+        shard_ids.update(range(int(start), int(end or start) + 1))
+
+    return sorted(shard_ids)
+
+
+def split_shards(shard_ids: List[int], processes: int) -> List[List[int]]:
+    """
+    Split shard ids in contiguous ranges of similar sizes.
+
+    Args:
+        shard_ids (List[int]): The shard ids.
+        processes (int): Number of ranges.
+
+    Returns:
+        List[List[int]]: The non empty ranges.
+    """
+    size, remainder = divmod(len(shard_ids), processes)
+    groups: List[List[int]] = []
+    start: int = 0
+
+    for index in range(processes):
+        end: int = start + size + (index < remainder)
+        if end > start:
+            groups.append(shard_ids[start:end])
+        start = end
+
+    return groups
+
+
+def get_process_path(path: str, shard_ids: Optional[List[int]]) -> str:
+    """
+    Get the path of a file owned by the process running some shards, so the processes do not share it.
+
+    Args:
+        path (str): Path of the file.
+        shard_ids (Optional[List[int]]): Shards run by the process, all of them when None.
+
+    Returns:
+        str: The path suffixed by the first shard of the process, unchanged when it runs every shard,
+            is empty or is an in-memory database.
+    """
+    if shard_ids is None or not path or path == ":memory:":
+        return path
+
+    root, extension = os.path.splitext(path)
+    return f"{root}-{shard_ids[0]}{extension}"
+
+
+async def get_recommended_shard_count(token: str) -> int:
+    """
+    Ask Discord for the number of shards recommended for the bot. (asynchronous)
+
+    Args:
+        token (str): Token of the bot.
+
+    Returns:
+        int: The recommended number of shards.
+    """
+    http: HTTPClient = HTTPClient(asyncio.get_running_loop())
+
+    try:
+        await http.static_login(token)
+        shard_count, _ = await http.get_bot_gateway()
+        return shard_count
+    finally:
+        await http.close()
+
+
+class ShardSupervisor:
+    """
+    Run the shards of the bot in several processes, each owning a range of shards,
+    and restart the processes that stop unexpectedly.
+    """
+
+    target: Callable[[str, int, List[int], int], None]
+    token: str
+    shard_count: int
+    groups: List[List[int]]
+    processes: Dict[int, multiprocessing.process.BaseProcess]
+    stopping: bool
+    deadline: float
+
+    def __init__(
+        self, target: Callable[[str, int, List[int], int], None], token: str, shard_count: int, groups: List[List[int]]
+    ):
+        self.target = target
+        self.token = token
+        self.shard_count = shard_count
+        self.groups = groups
+        self.processes = {}
+        self.stopping = False
+        self.deadline = 0
+
+    def start(self, index: int):
+        """
+        Start the process owning a range of shards.
+
+        Args:
+            index (int): Index of the range.
+        """
+        context = multiprocessing.get_context("spawn")
+        process = context.Process(
+            target=self.target,
+            args=(self.token, self.shard_count, self.groups[index], index),
+            name=f"shards-{index}",
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info("Started process %s owning the shards %s", process.pid, self.groups[index])
+
+    def stop(self, *args):
+        """
+        Ask every process to stop, used as signal handler.
+        The processes close their client, and are killed if they are still running after `SHARD_STOP_TIMEOUT`.
+        """
+        if not self.stopping:
+            self.stopping = True
+            self.deadline = time.monotonic() + SHARD_STOP_TIMEOUT
+
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    def kill(self):
+        """
+        Kill the processes still running after the stop timeout.
+        """
+        for index, process in self.processes.items():
+            if process.is_alive():
+                logger.warning("Killing the process owning the shards %s, it did not stop in time", self.groups[index])
+                process.kill()
+
+    def run(self):
+        """
+        Start the processes and supervise them until they all stopped.
+        """
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for index in range(len(self.groups)):
+            self.start(index)
+
+        restarts: Dict[int, float] = {}
+
+        while self.processes or restarts:
+            if self.processes:
+                wait([process.sentinel for process in self.processes.values()], timeout=1)
+            else:
+                time.sleep(1)
+
+            if self.stopping and time.monotonic() >= self.deadline:
+                self.kill()
+                self.deadline = float("inf")
+
+            for index, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+
+                del self.processes[index]
+
+                if self.stopping or process.exitcode == 0:
+                    continue
+
+                logger.warning("Process owning the shards %s exited with code %s", self.groups[index], process.exitcode)
+                restarts[index] = time.monotonic() + SHARD_RESTART_DELAY
+
+            for index, restart in list(restarts.items()):
+                if self.stopping:
+                    restarts.clear()
+                elif time.monotonic() >= restart:
+                    del restarts[index]
+                    self.start(index)
@@ -0,0 +1,176 @@
+import builtins
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+STARTUP_REPORT: bool = os.environ.get("STARTUP_REPORT", "0") == "1"
+STARTUP_REPORT_IMPORTS: int = 15
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class ImportTimer:
+    """
+    Time the modules imported by `import` statements, by wrapping `builtins.__import__`.
+    The cumulative time of a module includes the modules it imports, its own time does not.
+    """
+
+    cumulative: Dict[str, float]
+    own: Dict[str, float]
+    _local: threading.local
+    preloaded: int
+    _import: Optional[Callable[..., Any]]
+
+    def __init__(self):
+        self.cumulative = {}
+        self.own = {}
+        self.preloaded = 0
+        self._local = threading.local()
+        self._import = None
+
+    @property
+    def children(self) -> List[float]:
+        """
+        Stack of the time spent importing the children of the modules being imported by the current thread.
+        """
+        if not hasattr(self._local, "children"):
+            self._local.children = []
+        return self._local.children
+
+    def install(self):
+        if self._import is None:
+            self.preloaded = len(sys.modules)
+            self._import = builtins.__import__
+            builtins.__import__ = self.__import__
+
+    def uninstall(self):
+        if self._import is not None:
+            builtins.__import__ = self._import
+            self._import = None
+
+    def __import__(self, name: str, globals: Optional[Dict] = None, *args, **kwargs) -> Any:
+        assert self._import is not None
+
+        level: int = kwargs.get("level", args[2] if len(args) > 2 else 0)
+        module: str = name
+
+        if level:
+            try:
+                module = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__") or "")
+            except (ImportError, ValueError):
+                pass
+
+        if module in sys.modules:
+            return self._import(name, globals, *args, **kwargs)
+
+        children: List[float] = self.children
+        children.append(0)
+        start: float = time.perf_counter()
+
+        try:
+            return self._import(name, globals, *args, **kwargs)
+        finally:
+            duration: float = time.perf_counter() - start
+            own: float = duration - children.pop()
+
+            if children:
+                children[-1] += duration
+
+            if module in sys.modules and module not in self.cumulative:
+                self.cumulative[module] = duration
+                self.own[module] = own
+
+    def get_slowest(self, count: int) -> List[Tuple[str, float, float]]:
+        """
+        Get the modules that were the slowest to import.
+
+        Args:
+            count (int): Number of modules.
+
+        Returns:
+            List[Tuple[str, float, float]]: The names, cumulative and own import times of the modules.
+        """
+        names: List[str] = sorted(self.cumulative, key=self.cumulative.__getitem__, reverse=True)[:count]
+        return [(name, self.cumulative[name], self.own[name]) for name in names]
+
+
+class StartupReport:
+    """
+    Break down the startup time of the bot in phases, and the imports done during them.
+    Disabled by default, it is enabled by the `--startup-report` flag.
+    """
+
+    enabled: bool
+    started: float
+    phases: List[Tuple[str, float]]
+    imports: ImportTimer
+
+    def __init__(self, enabled: bool = STARTUP_REPORT):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.phases = []
+        self.imports = ImportTimer()
+
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            self.imports.install()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time a phase of the startup.
+
+        Args:
+            name (str): Name of the phase.
+        """
+        start: float = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.phases.append((name, time.perf_counter() - start))
+
+    def mark(self, name: str):
+        """
+        Record the time elapsed since the startup began, when this module was imported.
+
+        Args:
+            name (str): Name of the milestone.
+        """
+        if self.enabled:
+            self.phases.append((f"{name} (since start)", time.perf_counter() - self.started))
+
+    def format(self) -> str:
+        lines: List[str] = ["Startup report:", "  Phases:"]
+        lines += [f"    {name:<40}{duration * 1000:>10.1f} ms" for name, duration in self.phases]
+        lines += ["  Slowest imports:", f"    {'module':<40}{'cumulative':>13}{'own':>13}"]
+        lines += [
+            f"    {name:<40}{cumulative * 1000:>10.1f} ms{own * 1000:>10.1f} ms"
+            for name, cumulative, own in self.imports.get_slowest(STARTUP_REPORT_IMPORTS)
+        ]
+        lines.append(f"  Modules imported before the import timer started (not timed): {self.imports.preloaded}")
+        return "\n".join(lines)
+
+    def report(self):
+        """
+        Log the report once the startup is over, and stop timing the imports.
+        """
+        if not self.enabled:
+            return
+
+        self.imports.uninstall()
+        logger.info(self.format())
+        self.enabled = False
+
+
+startup: StartupReport = StartupReport()
@@ -1,12 +1,46 @@
-from typing import Any, Dict, List, Optional
+import os
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
 
-from discord import FFmpegPCMAudio, PCMVolumeTransformer
-from yt_dlp import YoutubeDL, utils
+from discord import AudioSource, FFmpegOpusAudio, FFmpegPCMAudio, PCMVolumeTransformer
+from discord.opus import Encoder
 
-from discord_bot.main import client
+from discord_bot.utils.audio import get_normalization_gain, scale
+from discord_bot.utils.cache import metadata_cache
+from discord_bot.utils.extractor import extractor
+
+SHORT_TITLE_LENGTH: int = 30
+DEFAULT_VOLUME: float = 0.5
+OPUS_PASSTHROUGH: bool = os.environ.get("OPUS_PASSTHROUGH", "1") == "1"
+LOUDNESS_NORMALIZATION: bool = os.environ.get("LOUDNESS_NORMALIZATION", "0") == "1"
+NORMALIZATION_WINDOW: int = 150
+BATCH_FRAMES: int = 10
+
+
+def get_seek_options(before_options: Optional[str], start: float) -> Optional[str]:
+    """
+    Add the input option making FFmpeg start reading a song from a position.
+
+    Args:
+        before_options (Optional[str]): FFmpeg input options.
+        start (float): Position in seconds, 0 to read the song from its beginning.
+
+    Returns:
+        Optional[str]: The input options.
+    """
+    if start <= 0:
+        return before_options
+
+    return f"{before_options} -ss {start:.2f}" if before_options else f"-ss {start:.2f}"
 
 
 class YoutubeSourceInfo:
+    """
+    Compact record of a track, only keeping the fields used by the bot instead of the whole yt-dlp data.
+    """
+
+    __slots__ = ("id", "title", "url", "duration", "thumbnail", "requester_id", "_short_title", "_duration_text")
+
     youtube_options: Dict = {
         "default_search": "auto",
         "format": "bestaudio*/best",
@@ -18,32 +52,84 @@ class YoutubeSourceInfo:
         "skip_download": True,
         "writeinfojson": True,
         "lazy_playlist": True,
-        "match_filter": utils.match_filter_func("url!*=/shorts/"),
+        "match_filter": "url!*=/shorts/",
+        "extract_flat": True,
     }
 
-    youtube: YoutubeDL = YoutubeDL({**youtube_options, **{"extract_flat": True}})
-
-    data: Dict
+    id: str
     title: str
     url: str
+    duration: int
+    thumbnail: Optional[str]
+    requester_id: Optional[int]
+    _short_title: Optional[str]
+    _duration_text: Optional[str]
+
+    def __init__(self, data: Dict, requester_id: Optional[int] = None):
+        thumbnails: List[Dict] = data.get("thumbnails") or []
 
-    def __init__(self, data: Dict):
-        self.data = data
+        self.id = data.get("id") or ""
         self.title = data["title"]
-        self.url = data["url"]
-        self.duration = data["duration"]
-        self.thumbnail = data["thumbnails"][-1]["url"]
+        self.url = data.get("webpage_url") or data["url"]
+        self.duration = int(data.get("duration") or 0)
+        self.thumbnail = data.get("thumbnail") or (thumbnails[-1]["url"] if thumbnails else None)
+        self.requester_id = requester_id
+        self._short_title = None
+        self._duration_text = None
+
+    @property
+    def short_title(self) -> str:
+        """
+        Title truncated to fit in embed fields, computed once.
+
+        Returns:
+            str: The truncated title.
+        """
+        if self._short_title is None:
+            self._short_title = (
+                self.title if len(self.title) <= SHORT_TITLE_LENGTH else f"{self.title[:SHORT_TITLE_LENGTH - 3]}..."
+            )
+        return self._short_title
+
+    @property
+    def duration_text(self) -> str:
+        """
+        Formatted duration, computed once.
+
+        Returns:
+            str: The duration as `H:MM:SS`.
+        """
+        if self._duration_text is None:
+            self._duration_text = str(timedelta(seconds=self.duration))
+        return self._duration_text
+
+    def to_dict(self) -> Dict:
+        """
+        Get the metadata of the track, without the requester.
+
+        Returns:
+            Dict: The metadata, accepted back by the constructor.
+        """
+        return {
+            "id": self.id,
+            "title": self.title,
+            "url": self.url,
+            "duration": self.duration,
+            "thumbnail": self.thumbnail,
+        }
 
-    async def prepare(self) -> Optional["YoutubeSource"]:
+    async def prepare(self) -> Optional[AudioSource]:
         return await YoutubeSource.prepare(self.url)
 
     @classmethod
     async def search(cls, query: str, search: bool = False) -> List["YoutubeSourceInfo"]:
         """
         Search for a youtube video by returning the first 10 found options.
+        Results are served from the metadata cache when possible.
 
         Args:
             query (str): The query or URL to search for.
+            search (bool): Return the first 10 results instead of the first one.
 
         Returns:
             List[YoutubeSource]: A list of YoutubeSource objects.
@@ -53,7 +139,12 @@ class YoutubeSourceInfo:
         elif not query.startswith("https://www.youtube.com/"):
             query = f"ytsearch:{query}"
 
-        data: Any = await client.loop.run_in_executor(None, lambda: cls.youtube.extract_info(query, download=False))
+        cached: Optional[List[Dict]] = await metadata_cache.get(query)
+
+        if cached is not None:
+            return [cls(data=entry) for entry in cached]
+
+        data: Any = await extractor.extract("info", cls.youtube_options, query)
 
         if data is None:
             return []
@@ -64,10 +155,56 @@ class YoutubeSourceInfo:
         if type(data) != list:
             data = [data]
 
-        return [cls(data=entry) for entry in data if entry is not None]
+        songs: List[YoutubeSourceInfo] = [cls(data=entry) for entry in data if entry is not None]
+        metadata_cache.set(query, [song.to_dict() for song in songs])
+        return songs
+
+    @classmethod
+    async def stream(cls, query: str) -> AsyncIterator[List["YoutubeSourceInfo"]]:
+        """
+        Search for a youtube video or playlist, yielding the found songs by batches as soon as they are extracted.
+        Results are served from the metadata cache when possible.
+        (asynchronous)
+
+        Args:
+            query (str): The query or URL to search for.
+
+        Yields:
+            List[YoutubeSourceInfo]: The batches of found songs.
+        """
+        if not query.startswith("https://www.youtube.com/"):
+            query = f"ytsearch:{query}"
+
+        cached: Optional[List[Dict]] = await metadata_cache.get(query)
+
+        if cached is not None:
+            yield [cls(data=entry) for entry in cached]
+            return
+
+        entries: List[Dict] = []
+
+        async for batch in extractor.stream("info", cls.youtube_options, query):
+            songs: List[YoutubeSourceInfo] = [cls(data=entry) for entry in batch]
+            entries.extend(song.to_dict() for song in songs)
+            yield songs
+
+        metadata_cache.set(query, entries)
+
+
+class Stream(NamedTuple):
+    url: str
+    codec: Optional[str]
 
 
 class YoutubeSource(PCMVolumeTransformer):
+    """
+    Audio source decoded to PCM.
+
+    Frames are read by batches so the volume and the loudness normalization gain are applied with a
+    single vectorized operation for several 20 ms frames. The normalization gain is measured on the
+    first seconds of the song.
+    """
+
     youtube_options: Dict = {
         "default_search": "auto",
         "format": "bestaudio*/best",
@@ -78,7 +215,7 @@ class YoutubeSource(PCMVolumeTransformer):
         "ratelimit": 5000000,
         "skip_download": True,
         "writeinfojson": True,
-        "match_filter": utils.match_filter_func("url!*=/shorts/"),
+        "match_filter": "url!*=/shorts/",
     }
 
     ffmpeg_options: Dict = {
@@ -86,17 +223,160 @@ class YoutubeSource(PCMVolumeTransformer):
         "options": "-vn",
     }
 
-    youtube: YoutubeDL = YoutubeDL(youtube_options)
+    gain: float
+    normalize: bool
+    _batch: memoryview
+    _position: int
+
+    def __init__(self, source, volume: float = DEFAULT_VOLUME, normalize: bool = LOUDNESS_NORMALIZATION):
+        super().__init__(source, volume)
+        self.gain = 1
+        self.normalize = normalize
+        self._batch = memoryview(b"")
+        self._position = 0
+
+    @property
+    def buffered(self) -> int:
+        return len(self._batch) - self._position
+
+    def fill(self, frames: int) -> bool:
+        """
+        Read and scale the next frames of the original source.
+
+        Args:
+            frames (int): Maximum number of frames to read.
+
+        Returns:
+            bool: False if the original source is exhausted.
+        """
+        data: List[bytes] = []
+
+        for _ in range(frames):
+            frame: bytes = self.original.read()
+            if not frame:
+                break
+            data.append(frame)
+
+        if not data:
+            return False
 
-    def __init__(self, source, volume: float = 0.5, *args, **kwargs):
-        super().__init__(source, volume, *args, **kwargs)
+        batch: bytes = b"".join(data)
+
+        if self.normalize:
+            self.normalize = False
+            self.gain = get_normalization_gain(batch)
+
+        self._batch = memoryview(scale(batch, min(self.volume, 2.0) * self.gain))
+        self._position = 0
+        return True
+
+    def read(self) -> bytes:
+        if self._position >= len(self._batch) and not self.fill(
+            NORMALIZATION_WINDOW if self.normalize else BATCH_FRAMES
+        ):
+            return b""
+
+        frame: bytes = bytes(self._batch[self._position : self._position + Encoder.FRAME_SIZE])
+        self._position += Encoder.FRAME_SIZE
+        return frame
 
     @classmethod
-    async def prepare(cls, url: str) -> Optional["YoutubeSource"]:
-        data: Any = await client.loop.run_in_executor(None, lambda: cls.youtube.extract_info(url, download=False))
+    async def resolve(cls, url: str) -> Optional[Stream]:
+        """
+        Resolve the URL and codec of the audio stream of a video.
+
+        Args:
+            url (str): URL of the video.
+
+        Returns:
+            Optional[Stream]: The audio stream, None if it could not be resolved.
+        """
+        data: Any = await extractor.extract("source", cls.youtube_options, url)
 
         if data is None or "url" not in data:
             return None
 
-        source: FFmpegPCMAudio = FFmpegPCMAudio(data["url"], **cls.ffmpeg_options)
-        return cls(source)
+        return Stream(data["url"], data.get("acodec"))
+
+    @classmethod
+    def from_stream(cls, stream: Stream, volume: float = DEFAULT_VOLUME, start: float = 0) -> AudioSource:
+        """
+        Create an audio source reading an already resolved stream.
+        Opus streams are passed through without being decoded by the bot, unless the loudness is normalized.
+
+        Args:
+            stream (Stream): The audio stream.
+            volume (float): Volume of the source.
+            start (float): Position in seconds the song starts from.
+
+        Returns:
+            AudioSource: The audio source.
+        """
+        before_options: str = get_seek_options(cls.ffmpeg_options["before_options"], start)
+
+        if OPUS_PASSTHROUGH and not LOUDNESS_NORMALIZATION and stream.codec == "opus":
+            return YoutubeOpusSource.create(stream.url, volume, before_options)
+
+        source: FFmpegPCMAudio = FFmpegPCMAudio(
+            stream.url, before_options=before_options, options=cls.ffmpeg_options["options"]
+        )
+        return cls(source, volume)
+
+    @classmethod
+    def from_file(cls, path: str, volume: float = DEFAULT_VOLUME, start: float = 0) -> AudioSource:
+        """
+        Create an audio source reading a local Opus file.
+
+        Args:
+            path (str): Path of the audio file.
+            volume (float): Volume of the source.
+            start (float): Position in seconds the song starts from.
+
+        Returns:
+            AudioSource: The audio source.
+        """
+        before_options: Optional[str] = get_seek_options(None, start)
+
+        if OPUS_PASSTHROUGH and not LOUDNESS_NORMALIZATION:
+            return YoutubeOpusSource.create(path, volume, before_options)
+
+        source: FFmpegPCMAudio = FFmpegPCMAudio(
+            path, before_options=before_options, options=cls.ffmpeg_options["options"]
+        )
+        return cls(source, volume)
+
+    @classmethod
+    async def prepare(cls, url: str) -> Optional[AudioSource]:
+        stream: Optional[Stream] = await cls.resolve(url)
+        return cls.from_stream(stream) if stream else None
+
+
+class YoutubeOpusSource(FFmpegOpusAudio):
+    """
+    Audio source sending Opus packets produced by FFmpeg, so the bot never decodes nor encodes the audio itself.
+    The packets are copied as is at full volume, otherwise the volume is applied by an FFmpeg filter.
+    """
+
+    volume: float
+
+    @classmethod
+    def create(
+        cls, url: str, volume: float = DEFAULT_VOLUME, before_options: Optional[str] = None
+    ) -> "YoutubeOpusSource":
+        """
+        Create an Opus audio source.
+
+        Args:
+            url (str): URL or path of the Opus audio.
+            volume (float): Volume of the source, applied once when FFmpeg starts.
+            before_options (Optional[str]): FFmpeg input options.
+
+        Returns:
+            YoutubeOpusSource: The audio source.
+        """
+        options: str = "-vn" if volume == 1 else f"-vn -filter:a volume={volume}"
+        source: YoutubeOpusSource = cls(
+            url, codec="opus" if volume == 1 else None, before_options=before_options, options=options
+        )
+        source.volume = volume
+        return source
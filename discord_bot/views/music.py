@@ -8,6 +8,7 @@ from discord.ui import Button, Select, View, button
 
 from discord_bot.main import client
 from discord_bot.extensions import music
+from discord_bot.utils.player import Player
 from discord_bot.utils.youtube import YoutubeSourceInfo
 
 
@@ -19,108 +20,164 @@ class PlayView(View):
     music_cog: "music.Music"
     context: Context
 
-    def __init__(self, music: "music.Music", context: Context, *args, **kwargs):
+    def __init__(self, music: "music.Music", context: Context, paused: bool = False, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.music_cog = music
         self.context = context
+        self.pause.label = "▶️" if paused else "⏸"
 
     @button(style=ButtonStyle.red, row=0, label="⏹")
     async def clear(self, interaction: Interaction, button: Button):
         """
-        Call the `clear` method of the music cog.
+        Clear the queue, the now playing panel then shows the empty queue.
 
         Args:
             interaction (Interaction): The interaction of the button.
             button (Button): The button itself.
         """
         await interaction.response.defer()
-        await self.music_cog.clear(self.context)
+        self.music_cog.clear_queue(self.music_cog.get_player(self.context))
 
     @button(style=ButtonStyle.grey, row=0, label="⏸")
     async def pause(self, interaction: Interaction, button: Button):
         """
-        Call the `pause/resume` methods of the music cog.
+        Pause or resume the song, the now playing panel is then updated with the other button.
 
         Args:
             interaction (Interaction): The interaction of the button.
             button (Button): The button itself.
         """
-        if self.music_cog.voice_channel is None:
-            await interaction.response.defer()
-            return
-
-        if self.music_cog.voice_channel.is_paused():
-            await self.music_cog.resume(self.context)
-            button.label = "⏸"
-        else:
-            await self.music_cog.pause(self.context)
-            button.label = "▶️"
+        await interaction.response.defer()
+        player: Player = self.music_cog.get_player(self.context)
 
-        await interaction.response.edit_message(view=self)
+        if player.voice_client is not None:
+            self.music_cog.set_paused(player, not player.voice_client.is_paused())
 
     @button(style=ButtonStyle.grey, row=0, label="⏭")
     async def next(self, interaction: Interaction, button: Button):
         """
-        Call the `next` method of the music cog.
+        Skip the song, the now playing panel then shows the next one.
 
         Args:
             interaction (Interaction): The interaction of the button.
             button (Button): The button itself.
         """
         await interaction.response.defer()
-        await self.music_cog.skip(self.context)
+        player: Player = self.music_cog.get_player(self.context)
+
+        if player.voice_client is not None:
+            player.voice_client.stop()
 
 
 class QueueView(View):
     """
-    Handle the interactivity of the `queue` command.
+    Handle the interactivity of the `queue` command, displaying the queue one page at a time.
     """
 
     class QueueSelect(Select):
         music_cog: "music.Music"
         context: Context
 
-        def __init__(self, music_cog: "music.Music", context: Context):
+        def __init__(self, music_cog: "music.Music", context: Context, page: int):
             self.music_cog = music_cog
             self.context = context
 
-            options = [SelectOption(label=song.title, emoji="🎵") for song, _ in self.music_cog.music_queue[0:25]]
-            super().__init__(placeholder="Pick a track to remove !", options=options)
+            start: int = page * music.QUEUE_PAGE_SIZE
+            entries = self.music_cog.get_player(context).queue.slice(start, start + music.QUEUE_PAGE_SIZE)
+            options = [SelectOption(label=entry.song.title[:100], value=str(entry.id), emoji="🎵") for entry in entries]
+            super().__init__(placeholder="Pick a track to remove !", options=options, row=0)
 
         async def callback(self, interaction: Interaction):
             """
             Callback of the select menu.
-            Display all of the songs in the queue and remove the selected ones.
+            Remove the selected songs from the queue and display the page again.
 
             Args:
                 interaction (Interaction): The interaction of the menu.
             """
-            # Remove option from select
-            for option in self.options:
-                if option.value in self.values:
-                    self.options.remove(option)
-
-            # Remove song from queue
-            for song in self.music_cog.music_queue:
-                if song[0].title in self.values:
-                    self.music_cog.music_queue.remove(song)
-
-            songs: List[YoutubeSourceInfo] = [song for song, _ in self.music_cog.music_queue]
-            view: Optional[View] = None if not self.options else self.view
-            embeds: List[Embed]
-
-            if not self.options:
-                embeds = [self.music_cog.get_embed(self.context, "Queue", "The queue is empty ...")]
-            else:
-                embeds = self.music_cog.get_songs_embeds(
-                    self.context, songs, "Queue", f"`Display` songs in the queue !"
-                )
-
-            await interaction.response.edit_message(embeds=embeds, view=view)
-
-    def __init__(self, music: "music.Music", context: Context, *args, **kwargs):
+            player: Player = self.music_cog.get_player(self.context)
+
+            for value in self.values:
+                player.queue.remove(int(value))
+            player.prefetch()
+            self.music_cog.update_idle(player)
+
+            assert isinstance(self.view, QueueView)
+            await self.view.update(interaction)
+
+    music_cog: "music.Music"
+    context: Context
+    page: int
+    select: Optional[QueueSelect]
+
+    def __init__(self, music_cog: "music.Music", context: Context, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.add_item(self.QueueSelect(music, context))
+        self.music_cog = music_cog
+        self.context = context
+        self.page = 0
+        self.select = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Clamp the current page and update the select menu and the buttons accordingly.
+        """
+        player: Player = self.music_cog.get_player(self.context)
+        pages: int = self.music_cog.get_queue_pages(player)
+        self.page = max(0, min(self.page, pages - 1))
+
+        if self.select is not None:
+            self.remove_item(self.select)
+
+        self.select = self.QueueSelect(self.music_cog, self.context, self.page) if player.queue else None
+
+        if self.select is not None:
+            self.add_item(self.select)
+
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page >= pages - 1
+
+    async def update(self, interaction: Interaction):
+        """
+        Display the current page of the queue.
+
+        Args:
+            interaction (Interaction): The interaction to answer.
+        """
+        player: Player = self.music_cog.get_player(self.context)
+
+        if not player.queue:
+            embed: Embed = self.music_cog.get_embed(self.context, "Queue", "The queue is empty ...")
+            await interaction.response.edit_message(embed=embed, view=None)
+            return
+
+        self.refresh()
+        embed = self.music_cog.get_queue_embed(self.context, player, self.page)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @button(style=ButtonStyle.grey, row=1, label="◀")
+    async def previous(self, interaction: Interaction, button: Button):
+        """
+        Display the previous page of the queue.
+
+        Args:
+            interaction (Interaction): The interaction of the button.
+            button (Button): The button itself.
+        """
+        self.page -= 1
+        await self.update(interaction)
+
+    @button(style=ButtonStyle.grey, row=1, label="▶")
+    async def next(self, interaction: Interaction, button: Button):
+        """
+        Display the next page of the queue.
+
+        Args:
+            interaction (Interaction): The interaction of the button.
+            button (Button): The button itself.
+        """
+        self.page += 1
+        await self.update(interaction)
 
 
 class SearchView(View):
@@ -151,19 +208,22 @@ class SearchView(View):
             if interaction.response.is_done():
                 await interaction.response.defer()
 
-            song = [(song, self.context) for song in self.songs if song.title in self.values][0]
-            self.music_cog.music_queue.append(song)
-            await self.music_cog.send_add_response(self.context, [song[0]])
+            player: Player = self.music_cog.get_player(self.context)
+
+            song = [song for song in self.songs if song.title in self.values][0]
+            player.queue.append(song, self.context)
+            player.prefetch()
+            await self.music_cog.send_add_response(self.context, [song])
 
-            if not self.music_cog.voice_channel:
+            if not player.voice_client:
                 await self.music_cog.connect(self.context)
 
-            assert self.music_cog.voice_channel is not None
+            assert player.voice_client is not None
 
-            if not self.music_cog.voice_channel.is_playing() and not self.music_cog.voice_channel.is_paused():
-                asyncio.run_coroutine_threadsafe(self.music_cog.play_music(), client.loop)
+            if not player.voice_client.is_playing() and not player.voice_client.is_paused():
+                asyncio.run_coroutine_threadsafe(self.music_cog.play_music(player), client.loop)
 
-            embed = self.music_cog.get_embed(self.context, "Search", f"chose `{song[0].title}`.")
+            embed = self.music_cog.get_embed(self.context, "Search", f"chose `{song.title}`.")
             await interaction.response.edit_message(embed=embed, view=None)
 
     def __init__(self, music_cog: "music.Music", context: Context, songs: List[YoutubeSourceInfo], *args, **kwargs):
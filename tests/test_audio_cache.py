@@ -0,0 +1,61 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from discord_bot.utils.audio_cache import AudioCache
+from discord_bot.utils.youtube import YoutubeSourceInfo
+
+SONG: YoutubeSourceInfo = YoutubeSourceInfo({"id": "song", "title": "Song", "url": "https://youtu.be/song"})
+
+
+class AudioCacheTest(unittest.TestCase):
+    def test_touch_played_files_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache: AudioCache = AudioCache(directory=directory)
+            path: str = cache.get_path(SONG.id)
+
+            with open(path, "wb"):
+                pass
+            os.utime(path, (0, 0))
+
+            self.assertEqual(cache.get(SONG), path)
+            self.assertEqual(os.path.getmtime(path), 0)
+
+            self.assertEqual(cache.get(SONG, play=True), path)
+            self.assertGreater(os.path.getmtime(path), 0)
+
+    def test_download_after_threshold(self):
+        async def play(cache: AudioCache, count: int):
+            for _ in range(count):
+                cache.record_play(SONG)
+            await asyncio.sleep(0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache: AudioCache = AudioCache(directory=directory, threshold=3)
+
+            with mock.patch.object(cache.downloader, "extract", return_value=None) as extract:
+                asyncio.run(play(cache, 3))
+                extract.assert_not_called()
+
+                asyncio.run(play(cache, 1))
+                extract.assert_called_once()
+
+    def test_forget_plays(self):
+        async def play(cache: AudioCache):
+            for index in range(3):
+                cache.record_play(
+                    YoutubeSourceInfo({"id": f"song{index}", "title": "Song", "url": "https://youtu.be/"})
+                )
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache: AudioCache = AudioCache(directory=directory)
+            cache.plays.size = 2
+            asyncio.run(play(cache))
+
+        self.assertEqual(list(cache.plays.entries), ["song1", "song2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import os
+import unittest
+from typing import Dict
+from unittest import mock
+
+from discord_bot.utils import audio_worker
+from discord_bot.utils.youtube import Stream, YoutubeSource
+
+
+class EncodeTest(unittest.TestCase):
+    def test_close_pipe_when_source_fails(self):
+        read, write = os.pipe()
+        volumes: Dict[int, float] = {1: 0.5}
+
+        with mock.patch.object(YoutubeSource, "from_stream", side_effect=RuntimeError("ffmpeg was not found.")):
+            audio_worker._encode(Stream("https://example.com/audio", "opus"), 0.5, 0, write, volumes, 1)
+
+        with os.fdopen(read, "rb") as pipe:
+            self.assertEqual(pipe.read(), b"")
+
+        self.assertEqual(volumes, {})
+        self.assertRaises(OSError, os.fstat, write)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from discord_bot.utils.cache import MetadataCache
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_video(self):
+        for url in (
+            "https://www.youtube.com/watch?v=video",
+            "https://m.youtube.com/watch?v=video&t=42",
+            "https://youtu.be/video",
+        ):
+            self.assertEqual(MetadataCache.normalize(url), "video:video")
+
+    def test_video_of_playlist(self):
+        for url in (
+            "https://www.youtube.com/watch?v=video&list=playlist",
+            "https://www.youtube.com/watch?list=playlist&v=video&index=2",
+            "https://youtu.be/video?list=playlist",
+        ):
+            self.assertEqual(MetadataCache.normalize(url), "video:video")
+
+    def test_playlist(self):
+        self.assertEqual(MetadataCache.normalize("https://www.youtube.com/playlist?list=playlist"), "playlist:playlist")
+
+    def test_other_url(self):
+        self.assertEqual(MetadataCache.normalize("https://www.youtube.com/@channel/"), "url:youtube.com/@channel")
+
+    def test_query(self):
+        self.assertEqual(MetadataCache.normalize("  ytsearch:Some   Song "), "query:ytsearch:some song")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import threading
+import unittest
+from typing import Any, Dict, List, Optional
+
+from discord_bot.utils import extractor
+
+VIDEO_URL: str = "https://www.youtube.com/watch?v=video&list=playlist"
+
+
+class FakeYoutube:
+    """
+    Stand-in for `YoutubeDL`, answering the unprocessed extractions from a dict of results by URL.
+    """
+
+    params: Dict
+    results: Dict[str, Any]
+
+    def __init__(self, results: Dict[str, Any]):
+        self.params = {}
+        self.results = results
+
+    def extract_info(self, url: str, download: bool = True, process: bool = True, ie_key: Optional[str] = None) -> Any:
+        assert not download and not process
+        return self.results[url]
+
+
+def stream(results: Dict[str, Any], query: str) -> List[List[Dict]]:
+    """
+    Run `_stream` in the current thread, with a fake `YoutubeDL` as the instance of the worker.
+
+    Args:
+        results (Dict[str, Any]): Unprocessed results, by URL.
+        query (str): The query to extract.
+
+    Returns:
+        List[List[Dict]]: The pushed batches.
+    """
+    batches: List[List[Dict]] = []
+    extractor._worker.youtubes = {"info": FakeYoutube(results)}
+
+    try:
+        extractor._stream("info", {}, query, 2, batches.append, threading.Event())
+    finally:
+        del extractor._worker.youtubes
+
+    return batches
+
+
+class StreamTest(unittest.TestCase):
+    def test_resolve_url_result(self):
+        results: Dict[str, Any] = {
+            VIDEO_URL: {"_type": "url", "url": "https://www.youtube.com/watch?v=video", "ie_key": "Youtube"},
+            "https://www.youtube.com/watch?v=video": {"id": "video", "title": "Video", "webpage_url": VIDEO_URL},
+        }
+
+        self.assertEqual(stream(results, VIDEO_URL), [[results["https://www.youtube.com/watch?v=video"]]])
+
+    def test_skip_entries_without_title(self):
+        entries: List[Any] = [{"id": "a", "title": "A"}, None, {"id": "b"}, {"id": "c", "title": "C"}]
+        batches: List[List[Dict]] = stream({"playlist": {"_type": "playlist", "entries": iter(entries)}}, "playlist")
+
+        self.assertEqual(batches, [[entries[0]], [entries[3]]])
+
+    def test_skip_result_without_title(self):
+        self.assertEqual(stream({"video": {"_type": "url", "url": "missing"}, "missing": {"id": "x"}}, "video"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from typing import Any, Dict
+
+from discord.ext.commands import Context
+
+from discord_bot.utils.journal import GuildState, QueueJournal, RestoredContext, get_record
+from discord_bot.utils.player import Player
+from discord_bot.utils.youtube import YoutubeSourceInfo
+
+GUILD_ID: int = 1
+CHANNEL_ID: int = 42
+
+
+def get_guild() -> Any:
+    """
+    Build a guild whose channels were all deleted, and whose members all left.
+
+    Returns:
+        Any: The guild.
+    """
+    return SimpleNamespace(
+        id=GUILD_ID,
+        me=SimpleNamespace(id=0),
+        text_channels=[],
+        get_channel=lambda id: None,
+        get_member=lambda id: None,
+    )
+
+
+def get_record_data(index: int) -> Dict:
+    song: Dict = {"id": f"song{index}", "title": f"Song {index}", "url": f"https://youtu.be/song{index}"}
+    return {"id": index, "song": song, "requester": 7, "channel": CHANNEL_ID}
+
+
+class RestoredChannelTest(unittest.TestCase):
+    def test_record_keeps_missing_channel(self):
+        context: Context = RestoredContext.create(get_guild(), get_record_data(0))
+        player: Player = Player(GUILD_ID)
+        player.queue.append(YoutubeSourceInfo(get_record_data(0)["song"]), context)
+
+        self.assertIsNone(context.channel)
+        self.assertEqual(get_record(next(iter(player.queue)))["channel"], CHANNEL_ID)
+
+    def test_restore_queue_of_missing_channel(self):
+        async def restore() -> Dict[int, GuildState]:
+            journal: QueueJournal = QueueJournal(path=os.path.join(directory, "queues.sqlite3"), interval=60)
+            player: Player = Player(GUILD_ID)
+            journal.track(player)
+
+            for index in range(3):
+                record: Dict = get_record_data(index)
+                player.queue.append(YoutubeSourceInfo(record["song"]), RestoredContext.create(get_guild(), record))
+
+            journal.compact(GUILD_ID)
+            await journal.close()
+
+            return await QueueJournal(path=journal.path).load()
+
+        with tempfile.TemporaryDirectory() as directory:
+            states: Dict[int, GuildState] = asyncio.run(restore())
+
+        self.assertEqual([record["song"]["id"] for record in states[GUILD_ID].entries], ["song0", "song1", "song2"])
+        self.assertEqual({record["channel"] for record in states[GUILD_ID].entries}, {CHANNEL_ID})
+
+
+if __name__ == "__main__":
+    unittest.main()
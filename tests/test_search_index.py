@@ -0,0 +1,58 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import List
+
+from discord_bot.utils.search_index import SearchIndex
+from discord_bot.utils.youtube import YoutubeSourceInfo
+
+
+def get_songs(start: int, stop: int) -> List[YoutubeSourceInfo]:
+    return [
+        YoutubeSourceInfo({"id": f"song{i}", "title": f"Song {i}", "url": f"https://youtu.be/song{i}"})
+        for i in range(start, stop)
+    ]
+
+
+class SearchIndexTest(unittest.TestCase):
+    def test_persist_tracks(self):
+        async def restore(path: str) -> SearchIndex:
+            index: SearchIndex = SearchIndex(path=path)
+            index.add(get_songs(0, 3))
+            index.record_play(get_songs(1, 2)[0])
+            index.close()
+
+            restored: SearchIndex = SearchIndex(path=path)
+            await restored.load()
+            return restored
+
+        with tempfile.TemporaryDirectory() as directory:
+            index: SearchIndex = asyncio.run(restore(os.path.join(directory, "search.sqlite3")))
+            index.close()
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.plays, {"song0": 0, "song1": 1, "song2": 0})
+        self.assertEqual([song.id for song in index.search("song 1")][:1], ["song1"])
+
+    def test_evict_least_played(self):
+        async def evict(path: str) -> SearchIndex:
+            index: SearchIndex = SearchIndex(path=path, size=10)
+            index.add(get_songs(0, 10), played=True)
+            index.add(get_songs(10, 12))
+            await asyncio.sleep(0.1)
+            index.close()
+
+            restored: SearchIndex = SearchIndex(path=path, size=10)
+            await restored.load()
+            return restored
+
+        with tempfile.TemporaryDirectory() as directory:
+            index: SearchIndex = asyncio.run(evict(os.path.join(directory, "search.sqlite3")))
+            index.close()
+
+        self.assertEqual(sorted(index.tracks), sorted(f"song{i}" for i in range(1, 10)))
+
+
+if __name__ == "__main__":
+    unittest.main()